@@ -8,7 +8,7 @@ from app.core.security import get_current_user
 from app.models.user import User
 from app.models.uploaded_file import UploadedFile
 from app.services.plotting_service import plotting_service
-from app.services.pdf_processor import PDFProcessor
+from app.services.ai_analysis import AIAnalysisService, get_ai_service
 from app.schemas.analysis import FinancialAnalysisResponse, FinancialAnalysisRequest
 from app.services.audit import AuditService
 from app.services.activity import ActivityService
@@ -29,7 +29,8 @@ async def test_analysis_router():
 async def generate_financial_analysis(
     request: FinancialAnalysisRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Generate financial analysis and plots from an uploaded PDF that belongs to the current user"""
     try:
@@ -46,8 +47,7 @@ async def generate_financial_analysis(
             )
 
         # Extract text from PDF
-        pdf_processor = PDFProcessor()
-        pdf_content = pdf_processor._extract_text_from_pdf(uploaded_file.file_path)
+        pdf_content = ai_service.pdf_processor._extract_text_from_pdf(uploaded_file.file_path)
 
         if not pdf_content:
             raise HTTPException(
@@ -57,7 +57,7 @@ async def generate_financial_analysis(
 
         # Generate financial analysis
         analysis_result = await plotting_service.generate_financial_analysis(
-            pdf_content, current_user, db
+            pdf_content, current_user, db, ai_service
         )
 
         if not analysis_result.get("success"):
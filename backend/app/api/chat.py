@@ -1,5 +1,6 @@
 import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
@@ -14,7 +15,7 @@ from app.schemas.chat import (
     AnalysisRequest,
     AnalysisResponse
 )
-from app.services.ai_analysis import AIAnalysisService
+from app.services.ai_analysis import AIAnalysisService, get_ai_service
 from app.services.audit import AuditService
 from app.services.activity import ActivityService
 import logging
@@ -22,7 +23,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-ai_service = AIAnalysisService()
 audit_service = AuditService()
 activity_service = ActivityService()
 
@@ -157,7 +157,8 @@ async def send_message(
     session_id: int,
     message_data: ChatMessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Send a message in a chat session and get AI response using RAG"""
 
@@ -299,7 +300,8 @@ async def send_message(
 async def analyze_company(
     analysis_request: AnalysisRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Perform direct analysis using RAG pipeline"""
 
@@ -348,6 +350,28 @@ async def analyze_company(
             detail=f"Analysis failed: {str(e)}"
         )
 
+@router.post("/analyze/stream")
+async def stream_analysis(
+    analysis_request: AnalysisRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
+):
+    """Stream a RAG analysis to the client as it is generated, as NDJSON events"""
+
+    await audit_service.log_action(
+        user_id=current_user.id,
+        action="stream_analysis",
+        resource_type="analysis",
+        details={"query": analysis_request.query},
+        db=db
+    )
+
+    return StreamingResponse(
+        ai_service.stream_balance_sheet_query(current_user, analysis_request.query),
+        media_type="application/x-ndjson"
+    )
+
 def _format_ai_response(analysis_result: dict) -> str:
     """Format AI analysis result into readable text"""
 
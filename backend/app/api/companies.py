@@ -6,11 +6,10 @@ from app.core.security import get_current_user
 from app.models.user import User
 from app.models.company import Company
 from app.schemas.company import CompanyCreate, CompanyResponse, CompanyHierarchy
-from app.services.ai_analysis import AIAnalysisService
+from app.services.ai_analysis import AIAnalysisService, get_ai_service
 from app.services.audit import AuditService
 
 router = APIRouter(prefix="/companies", tags=["companies"])
-ai_service = AIAnalysisService()
 audit_service = AuditService()
 
 @router.get("/", response_model=List[CompanyResponse])
@@ -80,7 +79,8 @@ async def create_company(
 async def get_company_balance_sheets(
     company_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Get metadata for all balance sheet PDF chunks for a company (for quick review of past balance sheets)"""
     if not current_user.has_access_to_company(company_id):
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List
@@ -9,8 +10,7 @@ from app.core.config import settings
 from app.models.user import User
 from app.models.uploaded_file import UploadedFile
 from app.schemas.uploaded_file import UploadedFileResponse, UploadedFileList
-from app.services.ai_analysis import AIAnalysisService
-from app.services.pinecone_store import PineconeStore
+from app.services.ai_analysis import AIAnalysisService, get_ai_service
 from app.services.audit import AuditService
 from app.services.activity import ActivityService
 import logging
@@ -18,7 +18,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/pdf", tags=["pdf-processing"])
-ai_service = AIAnalysisService()
 audit_service = AuditService()
 activity_service = ActivityService()
 
@@ -26,7 +25,8 @@ activity_service = ActivityService()
 async def process_balance_sheet_pdf(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """
     Process and store balance sheet PDF in vector database
@@ -129,17 +129,19 @@ async def process_balance_sheet_pdf(
 
 @router.get("/health")
 async def get_vector_store_health(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Get health status of vector database"""
     
-    health_status = ai_service.get_vector_store_health()
+    health_status = await asyncio.to_thread(ai_service.get_vector_store_health)
     return health_status
 
 @router.get("/statistics/{vertical}")
 async def get_vertical_statistics(
     vertical: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Get statistics for a specific vertical"""
     
@@ -151,14 +153,15 @@ async def get_vertical_statistics(
             detail="Access denied to this vertical"
         )
     
-    stats = ai_service.get_vertical_statistics(vertical)
+    stats = await asyncio.to_thread(ai_service.get_vertical_statistics, vertical)
     return stats
 
 @router.delete("/vertical/{vertical}")
 async def delete_vertical_data(
     vertical: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """
     Delete all data for a specific vertical
@@ -173,7 +176,7 @@ async def delete_vertical_data(
         )
     
     try:
-        success = ai_service.vector_store.delete_vertical_data(vertical)
+        success = await asyncio.to_thread(ai_service.vector_store.delete_vertical_data, vertical)
         
         if success:
             # Log the action
@@ -202,7 +205,8 @@ async def delete_vertical_data(
 @router.post("/reset")
 async def reset_vector_database(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """
     Reset all vector database data
@@ -217,7 +221,7 @@ async def reset_vector_database(
         )
     
     try:
-        success = ai_service.vector_store.reset_all_data()
+        success = await asyncio.to_thread(ai_service.vector_store.reset_all_data)
         
         if success:
             # Log the action
@@ -245,7 +249,8 @@ async def reset_vector_database(
 
 @router.get("/access-info")
 async def get_user_access_info(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Get information about user's access to different verticals"""
     
@@ -262,11 +267,12 @@ async def get_user_access_info(
 
 @router.get("/debug/vector-store")
 async def debug_vector_store(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Debug endpoint to check vector store status"""
     
-    health = ai_service.get_vector_store_health()
+    health = await asyncio.to_thread(ai_service.get_vector_store_health)
     user_verticals = ai_service._get_user_verticals(current_user)
     
     return {
@@ -279,7 +285,8 @@ async def debug_vector_store(
 @router.post("/test/load-sample-data")
 async def load_sample_data(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ai_service: AIAnalysisService = Depends(get_ai_service)
 ):
     """Load sample data for testing"""
     
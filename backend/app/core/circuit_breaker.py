@@ -0,0 +1,62 @@
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreakerOpen(Exception):
+    """Raised when a call is short-circuited because the breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency for reset_timeout seconds after fail_max consecutive failures.
+    Once the timeout passes the breaker is half-open: exactly one probe call goes through and
+    the rest are rejected until it resolves; a failure re-opens the breaker while a success closes it.
+    Every call let through must end in record_success, record_failure or release.
+    """
+
+    def __init__(self, name: str, fail_max: int, reset_timeout: float):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open"""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitBreakerOpen instead of letting a call through while open"""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probe_in_flight):
+            raise CircuitBreakerOpen(f"{self.name} circuit is open")
+        if state == "half_open":
+            self._probe_in_flight = True
+
+    def release(self):
+        """End a call without counting it as a success or a failure"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info(f"{self.name} circuit closed")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.fail_max:
+            if self.state != "open":
+                logger.warning(f"{self.name} circuit opened after {self._failures} consecutive failures")
+            self._opened_at = time.monotonic()
@@ -32,6 +32,18 @@ class Settings(BaseSettings):
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
     GEMINI_MAX_TOKENS: int = int(os.getenv("GEMINI_MAX_TOKENS", "4000"))
     GEMINI_TEMPERATURE: float = float(os.getenv("GEMINI_TEMPERATURE", "0.3"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+    # Seconds one Gemini attempt may take before it is abandoned and retried
+    GEMINI_REQUEST_TIMEOUT: float = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "60"))
+    GEMINI_BREAKER_FAIL_MAX: int = int(os.getenv("GEMINI_BREAKER_FAIL_MAX", "20"))
+    GEMINI_BREAKER_RESET_TIMEOUT: float = float(os.getenv("GEMINI_BREAKER_RESET_TIMEOUT", "30"))
+    
+    # Audit Logging
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.1"))
+    # Records allowed to wait for the writer; beyond this requests write their own records
+    AUDIT_QUEUE_MAXSIZE: int = int(os.getenv("AUDIT_QUEUE_MAXSIZE", "10000"))
     
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
@@ -50,8 +62,13 @@ class Settings(BaseSettings):
     TOP_K_RESULTS: int = 5
     SIMILARITY_THRESHOLD: float = 0.7
     MAX_CONTEXT_LENGTH: int = 8000
+    GEMINI_CONTEXT_TOKENS: int = int(os.getenv("GEMINI_CONTEXT_TOKENS", "4000"))
+    
+    # Response Cache (exact match on the normalized query)
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
     
     # Company Access Control
+    USER_VERTICALS_CACHE_TTL: int = int(os.getenv("USER_VERTICALS_CACHE_TTL", "300"))
     VERTICAL_KEYWORDS: dict = {
         "jio": ["JIO", "telecom", "telecommunications", "digital", "platform"],
         "retail": ["retail", "Reliance Retail", "stores", "commerce"],
@@ -67,6 +84,13 @@ class Settings(BaseSettings):
     # Pinecone Configuration
     PINECONE_API_KEY: Optional[str] = os.getenv("PINECONE_API_KEY")
     PINECONE_ENVIRONMENT: str = os.getenv("PINECONE_ENVIRONMENT", "gcp-starter")
+    PINECONE_CLOUD: str = os.getenv("PINECONE_CLOUD", "aws")
+    PINECONE_REGION: str = os.getenv("PINECONE_REGION", "us-east-1")
+    # Pinecone caps an upsert request at 2MB. One 1024-dim vector is ~21KB of JSON values plus
+    # up to ~11KB of metadata, so requests are cut at this many vectors or this many bytes,
+    # whichever comes first; the byte cap leaves headroom for the request envelope
+    PINECONE_UPSERT_BATCH_SIZE: int = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
+    PINECONE_UPSERT_MAX_BYTES: int = int(os.getenv("PINECONE_UPSERT_MAX_BYTES", "1500000"))
     
     class Config:
         env_file = ".env"
@@ -4,6 +4,7 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import time
 import logging
 import os
@@ -12,6 +13,9 @@ from app.core.config import settings
 from app.core.database import engine, Base
 from app.api import auth, chat, companies, pdf_processing, activities, analysis
 from app.services.audit import AuditService
+from app.services.ai_analysis import AIAnalysisService, gemini_breaker
+from app.services.plot_rendering import warm_plot_executor, shutdown_plot_executor
+from app.services.pdf_extraction import shutdown_extraction_executor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,10 +31,25 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created/verified")
     
+    # Start batched audit log writer
+    await AuditService.start()
+    
+    # Share one analysis service (and its vector store client) across requests
+    app.state.ai_service = AIAnalysisService()
+    
+    # Start plot rendering workers before the first analysis needs them
+    await asyncio.to_thread(warm_plot_executor)
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Balance Sheet Analyst API...")
+    
+    # Flush pending audit records before exit
+    await AuditService.stop()
+    
+    shutdown_plot_executor()
+    shutdown_extraction_executor()
 
 
 # Create FastAPI app
@@ -115,10 +134,14 @@ async def log_requests(request: Request, call_next):
 # Health check endpoint
 @app.get("/health")
 async def health_check():
+    # Always 200: the app still serves uploads and cached answers while Gemini is
+    # short-circuited, so the breaker state is reported rather than failing liveness
+    gemini_state = gemini_breaker.state
     return {
-        "status": "healthy",
+        "status": "healthy" if gemini_state != "open" else "degraded",
         "app_name": settings.APP_NAME,
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "gemini_circuit": gemini_state
     }
 
 # Root endpoint - serve React app or fallback
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -20,6 +20,13 @@ class AuditLog(Base):
     
     # Relationships
     user = relationship("User", back_populates="audit_logs")
+    
+    __table_args__ = (
+        # Per-user history, newest first
+        Index("ix_audit_user_created", user_id, created_at.desc()),
+        # Failed login lookups for security alerts
+        Index("ix_audit_failed_logins", action, success, created_at.desc()),
+    )
 
 
 class DataAccessLog(Base):
@@ -36,4 +43,16 @@ class DataAccessLog(Base):
     
     # Relationships
     user = relationship("User")
-    company = relationship("Company") 
\ No newline at end of file
+    company = relationship("Company")
+    
+    __table_args__ = (
+        # Per-company access history, newest first
+        Index("ix_dal_company_created", company_id, created_at.desc()),
+        # Partial index covering only high-volume accesses flagged as alerts
+        Index(
+            "ix_dal_high_volume_created",
+            created_at.desc(),
+            postgresql_where=record_count > 1000
+        ),
+    )
+ 
\ No newline at end of file
@@ -1,3 +1,4 @@
+from functools import cached_property
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -22,6 +23,21 @@ class Company(Base):
     parent_company = relationship("Company", remote_side=[id], backref="subsidiaries")
     users = relationship("User", secondary="user_companies", back_populates="companies")
     
+    @cached_property
+    def name_lc(self) -> str:
+        """Lowercased name, computed once per loaded instance"""
+        return self.name.lower()
+    
+    @cached_property
+    def industry_lc(self) -> str:
+        """Lowercased industry, computed once per loaded instance"""
+        return self.industry.lower()
+    
+    @cached_property
+    def sector_lc(self) -> str:
+        """Lowercased sector, computed once per loaded instance"""
+        return self.sector.lower()
+    
     def get_all_subsidiaries(self):
         """Get all subsidiaries recursively"""
         subsidiaries = []
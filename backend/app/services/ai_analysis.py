@@ -1,12 +1,21 @@
+import asyncio
+import functools
+import ahocorasick
+from cachetools import TTLCache
 import google.generativeai as genai
-import json
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+import orjson
+import re
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from fastapi import Request
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.company import Company
 from app.core.config import settings
-from app.services.pinecone_store import PineconeStore
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerOpen
+from app.services.pinecone_store import get_pinecone_store
 from app.services.pdf_processor import PDFProcessor
 import logging
 
@@ -23,12 +32,222 @@ if settings.GEMINI_API_KEY:
         logger.error(f"Failed to initialize Gemini client: {e}")
         genai_client = None
 
+# Shared across requests so an outage short-circuits every caller, not just one
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    fail_max=settings.GEMINI_BREAKER_FAIL_MAX,
+    reset_timeout=settings.GEMINI_BREAKER_RESET_TIMEOUT
+)
+
+GENERATION_CONFIG = genai.types.GenerationConfig(
+    max_output_tokens=settings.GEMINI_MAX_TOKENS,
+    temperature=settings.GEMINI_TEMPERATURE,
+)
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_NONE",
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_NONE",
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_NONE",
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_NONE",
+    },
+]
+
+# Rate-limit and transient server errors worth retrying with backoff
+RETRYABLE_GEMINI_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    # Raised by our own GEMINI_REQUEST_TIMEOUT
+    asyncio.TimeoutError,
+)
+
+# Shared by every Gemini call so concurrent requests stay within Gemini's rate limits
+_gemini_semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+@retry(
+    retry=retry_if_exception_type(RETRYABLE_GEMINI_ERRORS),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(settings.GEMINI_MAX_RETRIES),
+    reraise=True
+)
+async def _generate_with_retry(prompt: str, **kwargs):
+    """Call Gemini on the shared client, retrying rate-limit and transient server errors with backoff"""
+    # The slot is released before each backoff sleep so waiting retries don't starve other callers
+    async with _gemini_semaphore:
+        # Use the async client so the event loop stays free during the round-trip;
+        # the timeout applies per attempt
+        return await asyncio.wait_for(
+            genai_client.generate_content_async(prompt, **kwargs),
+            timeout=settings.GEMINI_REQUEST_TIMEOUT
+        )
+
+def _response_text(response) -> str:
+    """Text of a Gemini response; empty when the candidate was blocked or has no parts"""
+    try:
+        return response.text
+    except ValueError:
+        return ""
+
+async def generate_gemini_content(prompt: str, **kwargs) -> str:
+    """
+    Call Gemini through the shared circuit breaker
+    Returns: response text; raises CircuitBreakerOpen without calling Gemini while the breaker is open
+    """
+    gemini_breaker.before_call()
+    
+    try:
+        # Retries happen inside, so the breaker counts one failure per exhausted request
+        response = await _generate_with_retry(prompt, **kwargs)
+    except RETRYABLE_GEMINI_ERRORS:
+        gemini_breaker.record_failure()
+        raise
+    except BaseException:
+        gemini_breaker.release()
+        raise
+    
+    # Only a usable reply counts as Gemini being healthy
+    text = _response_text(response)
+    if not text:
+        gemini_breaker.record_failure()
+        raise Exception("Empty response from Gemini API")
+    
+    gemini_breaker.record_success()
+    return text
+
+# Chunk batches allowed to wait on the vector store while a PDF is still being parsed
+MAX_IN_FLIGHT_STORES = 8
+
+# Rough characters-per-token ratio for budgeting prompt context
+CHARS_PER_TOKEN = 4
+
+def stream_event(event_type: str, **fields) -> str:
+    """One NDJSON line of a streamed analysis: {"type": "delta" | "result" | "error", ...}"""
+    return orjson.dumps({"type": event_type, **fields}).decode() + "\n"
+
+# Outermost JSON object in a model response
+_JSON_BLOCK = re.compile(rb'\{.*\}', re.DOTALL)
+
+# Shape of the analysis the model is asked to return; matches what the chat UI renders
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "insights": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "impact": {"type": "string", "enum": ["high", "medium", "low"]}
+                },
+                "required": ["title", "description", "impact"]
+            }
+        },
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "priority": {"type": "string", "enum": ["high", "medium", "low"]}
+                },
+                "required": ["title", "description", "priority"]
+            }
+        },
+        "key_metrics": {
+            "type": "object",
+            "additionalProperties": {"type": ["string", "number"]}
+        },
+        "risks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "risk_type": {"type": "string"},
+                    "description": {"type": "string"},
+                    "severity": {"type": "string", "enum": ["high", "medium", "low"]}
+                },
+                "required": ["risk_type", "description", "severity"]
+            }
+        }
+    },
+    "required": ["summary", "insights", "recommendations", "key_metrics", "risks"]
+}
+
+_ANALYSIS_RESPONSE_SCHEMA_JSON = orjson.dumps(ANALYSIS_RESPONSE_SCHEMA, option=orjson.OPT_INDENT_2).decode()
+
+# Company names that map directly to a vertical
+COMPANY_VERTICAL_MAP = {
+    "Oil to Chemicals (O2C)": "o2c",
+    "Oil & Gas": "oilgas", 
+    "Financial Services": "financial",
+    "Media & Entertainment": "media",
+    "New Energy & Materials": "newenergy"
+}
+
+# Same mapping keyed by lowercased name, to match Company.name_lc
+_COMPANY_VERTICAL_MAP_LC = {name.lower(): vertical for name, vertical in COMPANY_VERTICAL_MAP.items()}
+
+def _build_vertical_automaton() -> ahocorasick.Automaton:
+    """Build one Aho-Corasick automaton over all vertical keywords, tagged with vertical priority"""
+    automaton = ahocorasick.Automaton()
+    for priority, (vertical, keywords) in enumerate(settings.VERTICAL_KEYWORDS.items()):
+        for keyword in keywords:
+            keyword_lower = keyword.lower()
+            # Earlier verticals win when the same keyword is listed twice
+            if keyword_lower not in automaton:
+                automaton.add_word(keyword_lower, (priority, vertical))
+    automaton.make_automaton()
+    return automaton
+
+VERTICAL_AUTOMATON = _build_vertical_automaton()
+
+# Resolved verticals keyed by (user id, role, assigned company ids)
+_user_verticals_cache = TTLCache(maxsize=4096, ttl=settings.USER_VERTICALS_CACHE_TTL)
+
+@functools.lru_cache(maxsize=4096)
+def map_company_to_vertical(industry_lc: str, sector_lc: str, name_lc: str) -> Optional[str]:
+    """
+    Map lowercased company fields to a vertical; pure function of its inputs so results are memoized
+    Callers pass Company.industry_lc / sector_lc / name_lc
+    """
+    # Check specific company names first
+    if name_lc in _COMPANY_VERTICAL_MAP_LC:
+        return _COMPANY_VERTICAL_MAP_LC[name_lc]
+    
+    # Then scan all fields for keywords in a single pass; newlines keep
+    # keywords from matching across field boundaries
+    haystack = f"{industry_lc}\n{sector_lc}\n{name_lc}"
+    matches = [match for _, match in VERTICAL_AUTOMATON.iter(haystack)]
+    if matches:
+        # Lowest priority value is the first vertical in VERTICAL_KEYWORDS
+        return min(matches)[1]
+    
+    return None
+
 class AIAnalysisService:
     """Service for AI-powered balance sheet analysis using RAG pipeline"""
     
     def __init__(self):
-        self.vector_store = PineconeStore()
+        self.vector_store = get_pinecone_store()
         self.pdf_processor = PDFProcessor()
+        # Keep references so response cache writes that finish after the
+        # response is returned are not garbage collected
+        self._cache_write_tasks = set()
     
     async def analyze_balance_sheet_query(
         self, 
@@ -55,14 +274,27 @@ class AIAnalysisService:
                     "charts": []
                 }
             
+            # Serve repeated queries from the response cache; the lookup is a single fetch
+            # by id, so a hit skips the vector search entirely
+            cached_result = await asyncio.to_thread(
+                self.vector_store.lookup_cached_response, query, user_verticals
+            )
+            if cached_result:
+                cached_result["query"] = query
+                cached_result["cached"] = True
+                return cached_result
+            
             # Get relevant context from vector store
-            context = self.vector_store.get_context_for_query(query, user_verticals)
-            logger.info(f"Context length: {len(context) if context else 0}")
+            context_chunks = await asyncio.to_thread(
+                self.vector_store.get_context_for_query, query, user_verticals
+            )
+            context, context_tokens = self._select_context(context_chunks)
+            logger.info(f"Context tokens: {context_tokens}")
             logger.info(f"Context preview: {context[:200] if context else 'None'}")
             
-            if not context or context == "No relevant information found in the balance sheet data.":
+            if not context:
                 # Check vector store health
-                health = self.vector_store.health_check()
+                health = await asyncio.to_thread(self.vector_store.health_check)
                 logger.warning(f"Vector store health: {health}")
                 
                 return {
@@ -79,17 +311,35 @@ class AIAnalysisService:
             # Create analysis prompt with context
             prompt = self._create_rag_analysis_prompt(query, context, user_verticals)
             
-            # Get AI response
-            response = await self._get_ai_response(prompt)
+            # Get AI response; while Gemini is down, serve an expired answer to the exact same
+            # query over the same verticals, flagged as stale, rather than failing outright
+            try:
+                response = await self._get_ai_response(prompt)
+            except CircuitBreakerOpen:
+                degraded_result = await asyncio.to_thread(
+                    self.vector_store.lookup_cached_response,
+                    query,
+                    user_verticals,
+                    max_age=float("inf")
+                )
+                if not degraded_result:
+                    raise
+                degraded_result["query"] = query
+                degraded_result["cached"] = True
+                degraded_result["degraded"] = True
+                degraded_result["stale"] = True
+                return degraded_result
             
             # Parse and structure the response
             analysis_result = self._parse_ai_response(response)
             
             # Add metadata
-            analysis_result["context_used"] = len(context)
+            analysis_result["context_used"] = context_tokens
             analysis_result["verticals_accessed"] = user_verticals
             analysis_result["query"] = query
             
+            self._cache_response_in_background(query, user_verticals, analysis_result)
+            
             return analysis_result
             
         except Exception as e:
@@ -101,8 +351,73 @@ class AIAnalysisService:
                 "charts": []
             }
     
+    def stream_balance_sheet_query(self, user: User, query: str) -> AsyncIterator[str]:
+        """
+        Stream the analysis for a query as the model generates it
+        Returns: async iterator of NDJSON events; zero or more {"type": "delta", "text"} fragments
+        of the raw model output, then exactly one {"type": "result", "result"} or {"type": "error", "error"}
+        """
+        # Resolve access eagerly, while the request's session is still open
+        user_verticals = self._get_user_verticals(user)
+        return self._stream_analysis(query, user_verticals)
+    
+    async def _stream_analysis(self, query: str, user_verticals: List[str]) -> AsyncIterator[str]:
+        """Yield response fragments as delta events, then parse and cache the full response once"""
+        try:
+            if not user_verticals:
+                yield stream_event("error", error="No accessible company data found for your role")
+                return
+            
+            cached_result = await asyncio.to_thread(
+                self.vector_store.lookup_cached_response, query, user_verticals
+            )
+            if cached_result:
+                cached_result["query"] = query
+                cached_result["cached"] = True
+                yield stream_event("result", result=cached_result)
+                return
+            
+            context_chunks = await asyncio.to_thread(
+                self.vector_store.get_context_for_query, query, user_verticals
+            )
+            context, context_tokens = self._select_context(context_chunks)
+            if not context:
+                yield stream_event("error", error="No relevant information found in the balance sheet data for your query")
+                return
+            
+            prompt = self._create_rag_analysis_prompt(query, context, user_verticals)
+            
+            fragments = []
+            async for fragment in self._stream_ai_response(prompt):
+                fragments.append(fragment)
+                yield stream_event("delta", text=fragment)
+            
+            # Parse once at the end for the structured result
+            analysis_result = self._parse_ai_response("".join(fragments))
+            analysis_result["context_used"] = context_tokens
+            analysis_result["verticals_accessed"] = user_verticals
+            analysis_result["query"] = query
+            self._cache_response_in_background(query, user_verticals, analysis_result)
+            yield stream_event("result", result=analysis_result)
+            
+        except Exception as e:
+            logger.error(f"Error streaming AI analysis: {e}")
+            yield stream_event("error", error=f"Analysis failed: {str(e)}")
+    
     def _get_user_verticals(self, user: User) -> List[str]:
         """Get list of verticals user has access to based on role and company assignments"""
+        # Assignment changes alter the company ids and therefore the key
+        cache_key = (user.id, user.role, tuple(sorted(c.id for c in user.companies)))
+        cached = _user_verticals_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        verticals = self._resolve_user_verticals(user)
+        _user_verticals_cache[cache_key] = tuple(verticals)
+        return verticals
+    
+    def _resolve_user_verticals(self, user: User) -> List[str]:
+        """Resolve verticals from role and company assignments without caching"""
         logger.info(f"Getting verticals for user: {user.username} (role: {user.role})")
         logger.info(f"User companies: {[c.name for c in user.companies]}")
         
@@ -139,32 +454,44 @@ class AIAnalysisService:
     
     def _map_company_to_vertical(self, company: Company) -> Optional[str]:
         """Map company to vertical based on industry/sector"""
-        industry_lower = company.industry.lower()
-        sector_lower = company.sector.lower()
-        name_lower = company.name.lower()
-        
-        # Add specific company name mappings
-        company_vertical_map = {
-            "Oil to Chemicals (O2C)": "o2c",
-            "Oil & Gas": "oilgas", 
-            "Financial Services": "financial",
-            "Media & Entertainment": "media",
-            "New Energy & Materials": "newenergy"
-        }
-        
-        # Check specific company names first
-        if company.name in company_vertical_map:
-            return company_vertical_map[company.name]
+        return map_company_to_vertical(company.industry_lc, company.sector_lc, company.name_lc)
+    
+    def _cache_response_in_background(
+        self, 
+        query: str, 
+        user_verticals: List[str], 
+        analysis_result: Dict[str, Any]
+    ):
+        """Write the response cache entry without holding up the response"""
+        # Snapshot the top level so fields the caller adds later can't race the serialization
+        task = asyncio.create_task(asyncio.to_thread(
+            self.vector_store.cache_response, query, list(user_verticals), dict(analysis_result)
+        ))
+        self._cache_write_tasks.add(task)
+        task.add_done_callback(self._cache_write_tasks.discard)
+    
+    def _select_context(self, context_chunks: List[Tuple[str, float]]) -> Tuple[str, int]:
+        """
+        Keep the most relevant chunks that fit in the GEMINI_CONTEXT_TOKENS budget
+        Returns: (context string, estimated token count)
+        """
+        budget = settings.GEMINI_CONTEXT_TOKENS
+        chosen = []
+        used_tokens = 0
         
-        # Then check keywords
-        for vertical, keywords in settings.VERTICAL_KEYWORDS.items():
-            for keyword in keywords:
-                if (keyword.lower() in industry_lower or 
-                    keyword.lower() in sector_lower or 
-                    keyword.lower() in name_lower):
-                    return vertical
+        for chunk, _ in sorted(context_chunks, key=lambda item: item[1], reverse=True):
+            chunk_tokens = -(-len(chunk) // CHARS_PER_TOKEN)
+            if used_tokens + chunk_tokens > budget:
+                if not chosen:
+                    # Never drop all context; trim the best chunk to fit instead
+                    chosen.append(chunk[:budget * CHARS_PER_TOKEN])
+                    used_tokens = budget
+                continue
+            
+            chosen.append(chunk)
+            used_tokens += chunk_tokens
         
-        return None
+        return "\n\n".join(chosen), used_tokens
     
     def _create_rag_analysis_prompt(
         self, 
@@ -205,7 +532,10 @@ Instructions:
 4. Do not make assumptions about other business verticals
 5. If insufficient data is available for {vertical_context}, state this clearly
 
-Provide a concise, professional analysis focusing on key insights and actionable recommendations for {vertical_context} only. Keep your response under 300 words."""
+Provide a concise, professional analysis focusing on key insights and actionable recommendations for {vertical_context} only. Keep the summary under 300 words.
+
+Respond with ONLY a JSON object (no markdown fences, no extra text) matching this JSON schema:
+{_ANALYSIS_RESPONSE_SCHEMA_JSON}"""
         
         return prompt
     
@@ -218,52 +548,65 @@ Provide a concise, professional analysis focusing on key insights and actionable
             raise Exception("Gemini client not initialized")
         
         try:
-            # Add timeout and safety checks
-            response = genai_client.generate_content(
+            return await generate_gemini_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=settings.GEMINI_MAX_TOKENS,
-                    temperature=settings.GEMINI_TEMPERATURE,
-                ),
-                safety_settings=[
-                    {
-                        "category": "HARM_CATEGORY_HARASSMENT",
-                        "threshold": "BLOCK_NONE",
-                    },
-                    {
-                        "category": "HARM_CATEGORY_HATE_SPEECH",
-                        "threshold": "BLOCK_NONE",
-                    },
-                    {
-                        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        "threshold": "BLOCK_NONE",
-                    },
-                    {
-                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                        "threshold": "BLOCK_NONE",
-                    },
-                ]
+                generation_config=GENERATION_CONFIG,
+                safety_settings=SAFETY_SETTINGS
             )
-            
-            if response.text:
-                return response.text
-            else:
-                raise Exception("Empty response from Gemini API")
-            
+        except CircuitBreakerOpen:
+            # Let the caller fall back to the response cache
+            raise
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
             raise Exception(f"Failed to get AI response: {str(e)}")
     
+    async def _stream_ai_response(self, prompt: str) -> AsyncIterator[str]:
+        """Stream response text from Gemini as it is generated"""
+        if not genai_client:
+            raise Exception("Gemini client not initialized")
+        
+        gemini_breaker.before_call()
+        
+        produced = False
+        try:
+            # The timeout covers the wait for the stream to start
+            response = await asyncio.wait_for(
+                genai_client.generate_content_async(
+                    prompt,
+                    generation_config=GENERATION_CONFIG,
+                    safety_settings=SAFETY_SETTINGS,
+                    stream=True
+                ),
+                timeout=settings.GEMINI_REQUEST_TIMEOUT
+            )
+            async for chunk in response:
+                # Blocked or empty candidates have no text; skip them rather than abort the stream
+                text = _response_text(chunk)
+                if text:
+                    produced = True
+                    yield text
+        except RETRYABLE_GEMINI_ERRORS:
+            gemini_breaker.record_failure()
+            raise
+        except BaseException:
+            # Includes the client disconnecting mid-stream, which says nothing about Gemini
+            gemini_breaker.release()
+            raise
+        
+        # As with generate_gemini_content, only a usable reply counts as healthy
+        if not produced:
+            gemini_breaker.record_failure()
+            raise Exception("Empty response from Gemini API")
+        gemini_breaker.record_success()
+    
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """Parse AI response and extract structured data"""
         try:
-            # Try to extract JSON from response
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
+            # Try to extract JSON from response in a single scan
+            match = _JSON_BLOCK.search(response.encode())
             
-            if start_idx != -1 and end_idx != 0:
-                json_str = response[start_idx:end_idx]
-                parsed_response = json.loads(json_str)
+            if match:
+                parsed_response = orjson.loads(match.group(0))
                 
                 # Ensure all required fields are present
                 return {
@@ -285,7 +628,7 @@ Provide a concise, professional analysis focusing on key insights and actionable
                     "charts": []
                 }
                 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"JSON parsing error: {e}")
             return {
                 "summary": response,
@@ -318,24 +661,57 @@ Provide a concise, professional analysis focusing on key insights and actionable
                     "error": f"PDF validation failed: {validation['errors']}"
                 }
             
-            # Process PDF and extract chunks by vertical
-            vertical_chunks = self.pdf_processor.process_balance_sheet_pdf(pdf_path, db)
-            logger.info(f"Extracted verticals: {list(vertical_chunks.keys())}")
+            # Pages are extracted and chunked lazily, so storing each batch as soon as it is
+            # produced overlaps upserts with parsing the rest of the PDF; at most
+            # MAX_IN_FLIGHT_STORES batches wait on the vector store at any time
+            batches = self.pdf_processor.iter_chunk_batches(pdf_path)
+            chunk_counts = {vertical: 0 for vertical in self.pdf_processor.vertical_keywords.keys()}
+            in_flight = {}
+            stored = {}
+            
+            def record(done):
+                for task in done:
+                    vertical = in_flight.pop(task)
+                    stored[vertical] = stored.get(vertical, True) and task.result()
+            
+            while True:
+                item = await asyncio.to_thread(next, batches, None)
+                if item is None:
+                    break
+                
+                vertical, batch = item
+                task = asyncio.create_task(
+                    self.vector_store.store_chunks_async(vertical, batch, chunk_counts[vertical])
+                )
+                in_flight[task] = vertical
+                chunk_counts[vertical] += len(batch)
+                
+                if len(in_flight) >= MAX_IN_FLIGHT_STORES:
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    record(done)
+            
+            if in_flight:
+                done, _ = await asyncio.wait(in_flight)
+                record(done)
+            
+            # Cached answers were built without this PDF's data, so drop them once it is stored
+            # (even partially) rather than serving them for the rest of their TTL
+            if any(chunk_counts.values()):
+                await asyncio.to_thread(self.vector_store.clear_response_cache)
             
-            # Store chunks in vector database
             storage_results = {}
             total_chunks = 0
             
-            for vertical, chunks in vertical_chunks.items():
-                logger.info(f"Processing vertical '{vertical}' with {len(chunks)} chunks")
-                if chunks:
-                    success = self.vector_store.store_chunks(vertical, chunks)
+            for vertical, chunk_count in chunk_counts.items():
+                logger.info(f"Processing vertical '{vertical}' with {chunk_count} chunks")
+                if chunk_count:
+                    success = stored[vertical]
                     storage_results[vertical] = {
                         "success": success,
-                        "chunks_stored": len(chunks)
+                        "chunks_stored": chunk_count
                     }
-                    total_chunks += len(chunks)
-                    logger.info(f"Stored {len(chunks)} chunks for vertical '{vertical}', success: {success}")
+                    total_chunks += chunk_count
+                    logger.info(f"Stored {chunk_count} chunks for vertical '{vertical}', success: {success}")
                 else:
                     storage_results[vertical] = {
                         "success": False,
@@ -345,7 +721,7 @@ Provide a concise, professional analysis focusing on key insights and actionable
                     logger.warning(f"No chunks extracted for vertical '{vertical}'")
             
             # Check vector store health after storage
-            health = self.vector_store.health_check()
+            health = await asyncio.to_thread(self.vector_store.health_check)
             logger.info(f"Vector store health after storage: {health}")
             
             return {
@@ -369,4 +745,9 @@ Provide a concise, professional analysis focusing on key insights and actionable
     
     def get_vertical_statistics(self, vertical: str) -> Dict[str, Any]:
         """Get statistics for a specific vertical"""
-        return self.vector_store.get_vertical_statistics(vertical) 
\ No newline at end of file
+        return self.vector_store.get_vertical_statistics(vertical)
+
+
+def get_ai_service(request: Request) -> AIAnalysisService:
+    """FastAPI dependency returning the process-wide service created at startup"""
+    return request.app.state.ai_service
@@ -1,12 +1,118 @@
+import asyncio
+import logging
+from sqlalchemy import select, literal, null, union_all, Integer
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from app.models.audit import AuditLog, DataAccessLog
 from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
 
 
 class AuditService:
     """Service for audit logging and security monitoring"""
     
+    # Shared by every instance so all routers feed one background writer
+    _queue: Optional[asyncio.Queue] = None
+    _flush_task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    async def start(cls):
+        """Start the background task that writes audit records in batches"""
+        cls._queue = asyncio.Queue(maxsize=settings.AUDIT_QUEUE_MAXSIZE)
+        cls._start_flush_task()
+    
+    @classmethod
+    def _start_flush_task(cls):
+        cls._flush_task = asyncio.create_task(cls._flush_loop())
+        cls._flush_task.add_done_callback(cls._on_flush_task_done)
+    
+    @classmethod
+    def _on_flush_task_done(cls, task: asyncio.Task):
+        """Restart the writer if it died, so queued records keep being written"""
+        if task.cancelled() or task is not cls._flush_task:
+            return
+        error = task.exception()
+        if error is None:
+            # Normal exit after stop()'s sentinel
+            return
+        logger.error(f"Audit writer crashed, restarting it: {error!r}", exc_info=error)
+        cls._start_flush_task()
+    
+    @classmethod
+    async def stop(cls):
+        """Flush queued audit records and stop the background writer"""
+        if cls._flush_task is None:
+            return
+        
+        # Sentinel tells the flush loop to write what it has and exit
+        await cls._queue.put(None)
+        await cls._flush_task
+        cls._flush_task = None
+        cls._queue = None
+    
+    @classmethod
+    async def _flush_loop(cls):
+        """Drain the queue in batches of AUDIT_BATCH_SIZE or every AUDIT_FLUSH_INTERVAL"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        
+        while not stopping:
+            record = await cls._queue.get()
+            if record is None:
+                break
+            
+            batch = [record]
+            deadline = loop.time() + settings.AUDIT_FLUSH_INTERVAL
+            while len(batch) < settings.AUDIT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(cls._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            
+            await asyncio.to_thread(cls._write_batch, batch)
+    
+    @staticmethod
+    def _write_batch(batch: List[Union[AuditLog, DataAccessLog]]):
+        """Insert a batch of audit records in one transaction"""
+        db = SessionLocal()
+        try:
+            # Group by type so each table gets a single bulk insert
+            db.bulk_save_objects(sorted(batch, key=lambda record: type(record).__name__))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Batch audit write failed, retrying records individually: {e}")
+            db.rollback()
+            for record in batch:
+                try:
+                    db.add(record)
+                    db.commit()
+                except Exception as record_error:
+                    logger.error(f"Dropping audit record: {record_error}")
+                    db.rollback()
+        finally:
+            db.close()
+    
+    async def _enqueue(self, record: Union[AuditLog, DataAccessLog], db: Session):
+        """Queue a record for the background writer, or write it directly if none is running or it is backed up"""
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(record)
+                return
+            except asyncio.QueueFull:
+                logger.warning("Audit queue is full, writing the record directly")
+        
+        db.add(record)
+        db.commit()
+    
     async def log_action(
         self,
         user_id: int,
@@ -35,8 +141,7 @@ class AuditService:
             success=success
         )
         
-        db.add(audit_log)
-        db.commit()
+        await self._enqueue(audit_log, db)
     
     async def log_data_access(
         self,
@@ -62,8 +167,7 @@ class AuditService:
             access_duration_ms=access_duration_ms
         )
         
-        db.add(access_log)
-        db.commit()
+        await self._enqueue(access_log, db)
     
     def get_user_audit_logs(
         self,
@@ -108,35 +212,54 @@ class AuditService:
         if not db:
             return []
         
-        # Look for suspicious activities
-        alerts = []
-        
         # Failed login attempts
-        failed_logins = db.query(AuditLog).filter(
+        failed_logins = select(
+            literal("failed_login").label("type"),
+            AuditLog.user_id,
+            null().cast(Integer).label("company_id"),
+            null().cast(Integer).label("record_count"),
+            AuditLog.created_at
+        ).where(
             AuditLog.action == "login",
             AuditLog.success == False
-        ).order_by(AuditLog.created_at.desc()).limit(10).all()
-        
-        for login in failed_logins:
-            alerts.append({
-                "type": "failed_login",
-                "user_id": login.user_id,
-                "timestamp": login.created_at,
-                "details": "Multiple failed login attempts"
-            })
+        ).order_by(AuditLog.created_at.desc()).limit(10).subquery()
         
         # Unusual data access patterns
-        high_volume_access = db.query(DataAccessLog).filter(
+        high_volume_access = select(
+            literal("high_volume_access").label("type"),
+            DataAccessLog.user_id,
+            DataAccessLog.company_id,
+            DataAccessLog.record_count,
+            DataAccessLog.created_at
+        ).where(
             DataAccessLog.record_count > 1000
-        ).order_by(DataAccessLog.created_at.desc()).limit(10).all()
-        
-        for access in high_volume_access:
-            alerts.append({
-                "type": "high_volume_access",
-                "user_id": access.user_id,
-                "company_id": access.company_id,
-                "timestamp": access.created_at,
-                "details": f"Accessed {access.record_count} records"
-            })
-        
-        return alerts 
\ No newline at end of file
+        ).order_by(DataAccessLog.created_at.desc()).limit(10).subquery()
+        
+        # Fetch both alert types in a single round-trip
+        combined = union_all(
+            select(failed_logins),
+            select(high_volume_access)
+        ).subquery()
+        rows = db.execute(
+            select(combined).order_by(combined.c.type, combined.c.created_at.desc())
+        ).all()
+        
+        alerts = []
+        for row in rows:
+            if row.type == "failed_login":
+                alerts.append({
+                    "type": "failed_login",
+                    "user_id": row.user_id,
+                    "timestamp": row.created_at,
+                    "details": "Multiple failed login attempts"
+                })
+            else:
+                alerts.append({
+                    "type": "high_volume_access",
+                    "user_id": row.user_id,
+                    "company_id": row.company_id,
+                    "timestamp": row.created_at,
+                    "details": f"Accessed {row.record_count} records"
+                })
+        
+        return alerts
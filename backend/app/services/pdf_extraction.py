@@ -0,0 +1,63 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import fitz  # PyMuPDF
+
+# Spawned workers import only this module, so keep its imports to PyMuPDF and the
+# standard library; pulling in the app stack here would add to every worker's start-up
+
+MAX_EXTRACTION_WORKERS = 8
+
+_extraction_executor: Optional[ProcessPoolExecutor] = None
+_extraction_executor_lock = threading.Lock()
+
+
+def extraction_worker_count() -> int:
+    """Number of worker processes the extraction pool runs"""
+    return min(os.cpu_count() or 1, MAX_EXTRACTION_WORKERS)
+
+
+def get_extraction_executor() -> ProcessPoolExecutor:
+    """Return the shared page extraction pool, creating it on first use"""
+    global _extraction_executor
+    with _extraction_executor_lock:
+        if _extraction_executor is None:
+            # PyMuPDF is not thread-safe, so use processes; spawn avoids forking the server's threads
+            _extraction_executor = ProcessPoolExecutor(
+                max_workers=extraction_worker_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extraction_executor
+
+
+def shutdown_extraction_executor():
+    """Stop the extraction workers"""
+    global _extraction_executor
+    with _extraction_executor_lock:
+        if _extraction_executor is not None:
+            _extraction_executor.shutdown()
+            _extraction_executor = None
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Extract pages [start, stop) in a worker process with its own document handle"""
+    with fitz.open(pdf_path) as doc:
+        return [doc.load_page(page_num).get_text() for page_num in range(start, stop)]
+
+
+def iter_pages_parallel(pdf_path: str, page_count: int) -> Iterator[str]:
+    """
+    Extract page text across the pool, split into one contiguous range per worker
+    Yields: page text in page order
+    """
+    step = -(-page_count // extraction_worker_count())
+    starts = range(0, page_count, step)
+    stops = [min(start + step, page_count) for start in starts]
+
+    executor = get_extraction_executor()
+    for page_texts in executor.map(extract_page_range, itertools.repeat(pdf_path), starts, stops):
+        yield from page_texts
@@ -1,6 +1,15 @@
 import os
+import asyncio
+import time
+import hashlib
+import functools
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import blake3
+import orjson
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from pinecone import Pinecone, ServerlessSpec
 from app.core.config import settings
 from app.services.pdf_processor import PDFChunk
@@ -8,27 +17,96 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
-class PineconeStore:
-    """Pinecone-based vector store with proper vertical isolation"""
+# Bumped whenever the embedding function changes; vectors from older versions are
+# ignored by search until the PDFs are reprocessed
+EMBEDDING_VERSION = "v2"
+
+# Verticals chunks can be stored under; only these have namespaces worth querying
+KNOWN_VERTICALS = frozenset(settings.VERTICAL_KEYWORDS)
+
+# Dimension of the Pinecone index and of every embedding written to it
+EMBEDDING_DIMENSION = 1024
+
+
+def split_upsert_batches(
+    vectors: List[Dict[str, Any]],
+    max_count: int,
+    max_bytes: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Group vectors into upsert requests of at most max_count vectors and about max_bytes of JSON
+    A single vector larger than max_bytes still gets a request of its own
+    """
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for vector in vectors:
+        vector_bytes = len(orjson.dumps(vector)) + 1  # plus the separating comma
+        if batch and (len(batch) == max_count or batch_bytes + vector_bytes > max_bytes):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(vector)
+        batch_bytes += vector_bytes
     
-    _instance = None
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def create_embeddings_batch(texts: List[str]) -> np.ndarray:
+    """
+    Create simple embeddings for many texts in one NumPy pass
+    Returns: (len(texts), EMBEDDING_DIMENSION) float32 array, the 32-byte BLAKE3 digest of each text tiled to the index dimension
+    """
+    digests = np.frombuffer(
+        b"".join(blake3.blake3(text.encode()).digest(length=32) for text in texts),
+        dtype=np.uint8
+    ).reshape(len(texts), 32)
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(PineconeStore, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
+    # Tile each 32-byte digest to the index dimension
+    return np.tile(digests, (1, EMBEDDING_DIMENSION // 32)).astype(np.float32) * np.float32(1.0 / 255.0)
+
+
+@functools.lru_cache(maxsize=4096)
+def create_simple_embedding(text: str) -> np.ndarray:
+    """
+    Embedding for a single text; deterministic, so repeated queries are served from the cache
+    Returns: read-only (EMBEDDING_DIMENSION,) float32 array shared between callers
+    """
+    embedding = create_embeddings_batch([text])[0]
+    embedding.flags.writeable = False
+    return embedding
+
+
+class _PineconeStoreImpl:
+    """Pinecone-based vector store with proper vertical isolation; obtain it via get_pinecone_store()"""
     
     def __init__(self):
-        if self._initialized:
-            return
-            
         self.index_name = "balance-sheet-chunks"
+        self.cache_namespace = "query_response_cache"
+        
+        # Bounds concurrent upserts when batches are streamed in
+        self._upsert_semaphore = asyncio.Semaphore(4)
+        
+        # Sends the upsert requests of one large store_chunks call in parallel
+        self._upsert_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pinecone-upsert")
+        
+        # Recent search results keyed by (query, verticals, top_k); cleared on every write.
+        # Pinecone is eventually consistent, so a result read just after a write may miss it;
+        # the short TTL bounds how long such a result is served
+        self._query_cache = TTLCache(maxsize=1024, ttl=30)
+        self._query_cache_lock = threading.Lock()
+        
+        # Latest describe_index_stats result (per-namespace counts included); also cleared on every write
+        self._stats_cache = TTLCache(maxsize=1, ttl=30)
+        
+        # Bumped on every clear; a read only caches its result if no write landed while it ran
+        self._write_generation = 0
         
         # Check if Pinecone is configured
         if not settings.PINECONE_API_KEY:
             logger.warning("Pinecone API key not configured, falling back to TF-IDF")
-            self._initialized = True
             return
         
         # Initialize Pinecone with new API
@@ -43,8 +121,6 @@ class PineconeStore:
             logger.error(f"Failed to initialize Pinecone: {e}")
             logger.warning("Falling back to TF-IDF approach")
             # Don't raise exception, just log and continue
-        
-        self._initialized = True
     
     def _setup_index(self):
         """Setup Pinecone index with new API"""
@@ -54,54 +130,83 @@ class PineconeStore:
                 # Create index with standard configuration
                 self.pc.create_index(
                     name=self.index_name,
-                    dimension=1024,
-                    metric="cosine"
+                    dimension=EMBEDDING_DIMENSION,
+                    metric="cosine",
+                    spec=ServerlessSpec(
+                        cloud=settings.PINECONE_CLOUD,
+                        region=settings.PINECONE_REGION
+                    )
                 )
                 logger.info(f"Created Pinecone index: {self.index_name}")
             else:
                 logger.info(f"Using existing Pinecone index: {self.index_name}")
             
             # Get index
-            self.index = self.pc.Index(self.index_name)
+            # pool_threads lets query_namespaces fan out over several verticals in parallel
+            self.index = self.pc.Index(self.index_name, pool_threads=8)
             
         except Exception as e:
             logger.error(f"Error setting up Pinecone index: {e}")
             raise
     
-    def store_chunks(self, vertical: str, chunks: List[PDFChunk]) -> bool:
-        """Store chunks for a specific vertical with proper isolation"""
+    def store_chunks(self, vertical: str, chunks: List[PDFChunk], start_index: int = 0) -> bool:
+        """
+        Store chunks for a specific vertical with proper isolation
+        start_index offsets vector ids so successive batches of one vertical don't collide
+        """
         try:
             if not chunks:
                 logger.warning(f"No chunks to store for vertical: {vertical}")
                 return False
             
+            # Embed every chunk in one batch
+            embeddings = self._create_embeddings_batch([chunk.content for chunk in chunks])
+            
             # Prepare vectors for Pinecone
             vectors = []
-            for i, chunk in enumerate(chunks):
-                # Create embedding for the chunk content
-                embedding = self._create_simple_embedding(chunk.content)
-                
-                vector_data = {
-                    'id': f"{vertical}_{chunk.page_number}_{i}",
-                    'values': embedding,
-                    'metadata': {
-                        'vertical': vertical,
-                        'content': chunk.content,
-                        'page_number': chunk.page_number,
-                        'start_char': chunk.start_char,
-                        'end_char': chunk.end_char,
-                        'company_vertical': chunk.company_vertical,
-                        'confidence_score': chunk.confidence_score,
-                        **chunk.metadata
-                    }
+            # Pinecone's REST client needs plain lists; convert the whole batch in one call
+            id_prefix = f"{EMBEDDING_VERSION}_{vertical}_"
+            namespace = self._vertical_namespace(vertical)
+            for i, (chunk, values) in enumerate(zip(chunks, embeddings.tolist()), start_index):
+                metadata = {
+                    'vertical': vertical,
+                    'embedding_version': EMBEDDING_VERSION,
+                    'content': chunk.content,
+                    'page_number': chunk.page_number,
+                    'start_char': chunk.start_char,
+                    'end_char': chunk.end_char,
+                    'company_vertical': chunk.company_vertical,
+                    'confidence_score': chunk.confidence_score
                 }
-                vectors.append(vector_data)
+                if chunk.metadata:
+                    metadata.update(chunk.metadata)
+                
+                vectors.append({
+                    'id': id_prefix + str(chunk.page_number) + "_" + str(i),
+                    'values': values,
+                    'metadata': metadata
+                })
+            
+            # Upsert vectors in requests under Pinecone's size limit, overlapping the round-trips
+            batches = split_upsert_batches(
+                vectors,
+                settings.PINECONE_UPSERT_BATCH_SIZE,
+                settings.PINECONE_UPSERT_MAX_BYTES
+            )
+            if len(batches) == 1:
+                self.index.upsert(vectors=batches[0], namespace=namespace)
+            else:
+                futures = [
+                    self._upsert_executor.submit(self.index.upsert, vectors=batch, namespace=namespace)
+                    for batch in batches
+                ]
+                # Surface the first failed batch as an error
+                for future in futures:
+                    future.result()
             
-            # Upsert vectors in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            # Cleared after the upsert; searches already in flight see the new write generation
+            # and skip caching what they read before it
+            self._clear_query_cache()
             
             logger.info(f"Stored {len(chunks)} chunks for vertical: {vertical}")
             return True
@@ -110,6 +215,16 @@ class PineconeStore:
             logger.error(f"Error storing chunks for vertical {vertical}: {e}")
             return False
     
+    async def store_chunks_async(
+        self, 
+        vertical: str, 
+        chunks: List[PDFChunk], 
+        start_index: int = 0
+    ) -> bool:
+        """Store a batch of chunks off the event loop, at most four batches at a time"""
+        async with self._upsert_semaphore:
+            return await asyncio.to_thread(self.store_chunks, vertical, chunks, start_index)
+    
     def search_similar_chunks(
         self, 
         query: str, 
@@ -122,21 +237,47 @@ class PineconeStore:
                 logger.warning("No user verticals provided for search")
                 return []
             
+            # Canonical access scope, shared by the cache key and the namespace list
+            verticals = tuple(sorted(set(user_verticals)))
+            cache_key = (query, verticals, top_k)
+            with self._query_cache_lock:
+                cached_results = self._query_cache.get(cache_key)
+                generation = self._write_generation
+            if cached_results is not None:
+                return list(cached_results)
+            
             # Create a simple embedding for the query
             query_embedding = self._create_simple_embedding(query)
             
-            # Search with metadata filter for user's verticals
-            filter_dict = {
-                "vertical": {"$in": user_verticals}
-            }
+            # Each vertical lives in its own namespace, so access control is the namespace list itself
+            namespaces = [
+                self._vertical_namespace(vertical) for vertical in verticals
+                if vertical in KNOWN_VERTICALS
+            ]
+            if not namespaces:
+                logger.warning(f"No known verticals among: {user_verticals}")
+                return []
+            filter_dict = {"embedding_version": {"$eq": EMBEDDING_VERSION}}
             
             # Query Pinecone with embedding
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                filter=filter_dict
-            )
+            if len(namespaces) == 1:
+                results = self.index.query(
+                    vector=query_embedding.tolist(),
+                    top_k=top_k,
+                    include_metadata=True,
+                    namespace=namespaces[0],
+                    filter=filter_dict
+                )
+            else:
+                # Queries the namespaces in parallel and merges the best top_k across them
+                results = self.index.query_namespaces(
+                    vector=query_embedding.tolist(),
+                    namespaces=namespaces,
+                    metric="cosine",
+                    top_k=top_k,
+                    include_metadata=True,
+                    filter=filter_dict
+                )
             
             # Process results
             processed_results = []
@@ -156,56 +297,159 @@ class PineconeStore:
                 })
             
             logger.info(f"Found {len(processed_results)} results for verticals: {user_verticals}")
-            return processed_results
+            with self._query_cache_lock:
+                if generation == self._write_generation:
+                    self._query_cache[cache_key] = processed_results
+            return list(processed_results)
             
         except Exception as e:
             logger.error(f"Error searching chunks: {e}")
             return []
     
-    def _create_simple_embedding(self, text: str) -> List[float]:
-        """Create a simple embedding for text"""
-        import hashlib
-        
-        # Create a hash of the text
-        hash_obj = hashlib.sha256(text.encode())
-        hash_bytes = hash_obj.digest()
-        
-        # Convert to 1024-dimensional vector (matching the index dimension)
-        embedding = []
-        for i in range(1024):
-            byte_index = i % len(hash_bytes)
-            embedding.append(float(hash_bytes[byte_index]) / 255.0)
+    def lookup_cached_response(
+        self, 
+        query: str, 
+        user_verticals: List[str],
+        max_age: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached analysis for the same normalized query over the same verticals
+        This is an exact-match cache fetched by id; max_age defaults to RESPONSE_CACHE_TTL_SECONDS
+        """
+        if max_age is None:
+            max_age = settings.RESPONSE_CACHE_TTL_SECONDS
         
-        return embedding
+        try:
+            cache_id = self._response_cache_id(query, user_verticals)
+            results = self.index.fetch(ids=[cache_id], namespace=self.cache_namespace)
+            
+            entry = results.vectors.get(cache_id)
+            if entry is None:
+                return None
+            
+            # Expire entries so new uploads are eventually reflected
+            created_at = entry.metadata.get('created_at', 0)
+            if time.time() - created_at > max_age:
+                return None
+            
+            logger.info(f"Response cache hit for verticals: {user_verticals}")
+            return orjson.loads(entry.metadata['response_json'])
+            
+        except Exception as e:
+            logger.error(f"Error looking up cached response: {e}")
+            return None
+    
+    def cache_response(
+        self, 
+        query: str, 
+        user_verticals: List[str], 
+        response: Dict[str, Any]
+    ) -> bool:
+        """Store an analysis result keyed by the normalized query and access scope"""
+        try:
+            self.index.upsert(
+                vectors=[{
+                    'id': self._response_cache_id(query, user_verticals),
+                    # Entries are only ever fetched by id; the index just requires a non-zero vector
+                    'values': self._create_simple_embedding(query).tolist(),
+                    'metadata': {
+                        'verticals': self._verticals_key(user_verticals),
+                        'response_json': orjson.dumps(response, default=str).decode(),
+                        'created_at': time.time()
+                    }
+                }],
+                namespace=self.cache_namespace
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error caching response: {e}")
+            return False
+    
+    def clear_response_cache(self) -> bool:
+        """Drop all cached query responses"""
+        try:
+            self.index.delete(delete_all=True, namespace=self.cache_namespace)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error clearing response cache: {e}")
+            return False
+    
+    def _clear_query_cache(self):
+        """Drop memoized search results and index stats after the index changes"""
+        with self._query_cache_lock:
+            self._write_generation += 1
+            self._query_cache.clear()
+            self._stats_cache.clear()
+    
+    def _describe_index_stats(self):
+        """Index stats, memoized between writes"""
+        with self._query_cache_lock:
+            stats = self._stats_cache.get("index")
+            generation = self._write_generation
+        if stats is None:
+            stats = self.index.describe_index_stats()
+            with self._query_cache_lock:
+                if generation == self._write_generation:
+                    self._stats_cache["index"] = stats
+        return stats
+    
+    def _vertical_namespace(self, vertical: str) -> str:
+        """Namespace holding one vertical's chunks, so a vertical can be dropped without a filtered delete"""
+        return f"vertical_{vertical}"
+    
+    def _verticals_key(self, user_verticals: List[str]) -> str:
+        """Canonical key so cached answers are only shared between identical access scopes"""
+        return ",".join(sorted(set(user_verticals)))
+    
+    def _response_cache_id(self, query: str, user_verticals: List[str]) -> str:
+        """Cache id for a query: case and whitespace differences map to the same entry"""
+        normalized_query = " ".join(query.lower().split())
+        key = f"{EMBEDDING_VERSION}:{self._verticals_key(user_verticals)}:{normalized_query}"
+        return hashlib.sha256(key.encode()).hexdigest()
     
-    def get_context_for_query(self, query: str, user_verticals: List[str]) -> str:
-        """Get context for a query by retrieving similar chunks"""
+    def _create_simple_embedding(self, text: str) -> np.ndarray:
+        """Create a simple embedding for text; convert with .tolist() only when building a request"""
+        return create_simple_embedding(text)
+    
+    def _create_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Create simple embeddings for many texts in one NumPy pass"""
+        return create_embeddings_batch(texts)
+    
+    def get_context_for_query(self, query: str, user_verticals: List[str]) -> List[Tuple[str, float]]:
+        """
+        Get context for a query by retrieving similar chunks
+        Returns: List of (labelled chunk text, similarity score), empty if nothing relevant was found
+        """
         try:
             similar_chunks = self.search_similar_chunks(query, user_verticals, top_k=3)
             
             if not similar_chunks:
                 logger.warning(f"No relevant chunks found for verticals: {user_verticals}")
-                return f"No relevant information found in the {', '.join(user_verticals)} data."
+                return []
             
-            # Combine chunks into context with vertical labeling
-            context_parts = []
+            # Label each chunk with its vertical and page
+            context_chunks = []
             for chunk in similar_chunks:
                 vertical = chunk.get('company_vertical', 'unknown')
-                context_parts.append(f"[{vertical.upper()}] Page {chunk['page_number']}: {chunk['content']}")
+                context_chunks.append((
+                    f"[{vertical.upper()}] Page {chunk['page_number']}: {chunk['content']}",
+                    chunk['similarity_score']
+                ))
             
-            context = "\n\n".join(context_parts)
-            logger.info(f"Retrieved context for verticals {user_verticals}: {len(context)} characters")
-            return context
+            logger.info(f"Retrieved {len(context_chunks)} context chunks for verticals {user_verticals}")
+            return context_chunks
             
         except Exception as e:
             logger.error(f"Error getting context: {e}")
-            return f"Error retrieving context from {', '.join(user_verticals)} data."
+            return []
     
     def health_check(self) -> Dict[str, Any]:
         """Check health of Pinecone vector store"""
         try:
             # Get index stats
-            stats = self.index.describe_index_stats()
+            stats = self._describe_index_stats()
             
             return {
                 "status": "healthy",
@@ -227,8 +471,10 @@ class PineconeStore:
     def delete_vertical_data(self, vertical: str) -> bool:
         """Delete all data for a specific vertical"""
         try:
-            # Delete vectors with vertical filter
-            self.index.delete(filter={"vertical": vertical})
+            # Drop the vertical's namespace outright instead of a metadata-filtered delete
+            self.index.delete(delete_all=True, namespace=self._vertical_namespace(vertical))
+            self._clear_query_cache()
+            self.clear_response_cache()
             logger.info(f"Deleted data for vertical: {vertical}")
             return True
             
@@ -239,8 +485,12 @@ class PineconeStore:
     def reset_all_data(self) -> bool:
         """Reset all data in the index"""
         try:
-            # Delete all vectors
-            self.index.delete(delete_all=True)
+            # Delete all vectors, including any left in the default namespace by older versions
+            for namespace in self.index.describe_index_stats().namespaces:
+                if namespace != self.cache_namespace:
+                    self.index.delete(delete_all=True, namespace=namespace)
+            self._clear_query_cache()
+            self.clear_response_cache()
             logger.info("Reset all data in Pinecone index")
             return True
             
@@ -251,12 +501,12 @@ class PineconeStore:
     def get_vertical_statistics(self, vertical: str) -> Dict[str, Any]:
         """Get statistics for a specific vertical"""
         try:
-            # Get index stats with filter
-            stats = self.index.describe_index_stats(filter={"vertical": vertical})
+            # Per-vertical counts come from the namespace summary
+            namespace_stats = self._describe_index_stats().namespaces.get(self._vertical_namespace(vertical))
             
             return {
                 "vertical": vertical,
-                "vector_count": stats.total_vector_count,
+                "vector_count": namespace_stats.vector_count if namespace_stats else 0,
                 "status": "available"
             }
             
@@ -265,4 +515,19 @@ class PineconeStore:
             return {
                 "vertical": vertical,
                 "error": str(e)
-            } 
\ No newline at end of file
+            }
+
+
+_pinecone_store: Optional[_PineconeStoreImpl] = None
+_pinecone_store_lock = threading.Lock()
+
+
+def get_pinecone_store() -> _PineconeStoreImpl:
+    """Process-wide vector store, created on first use"""
+    global _pinecone_store
+    # functools.cache would let two threads racing the first call both connect and set up the index
+    if _pinecone_store is None:
+        with _pinecone_store_lock:
+            if _pinecone_store is None:
+                _pinecone_store = _PineconeStoreImpl()
+    return _pinecone_store
@@ -0,0 +1,263 @@
+import base64
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Sequence, Tuple
+
+import matplotlib
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+import numpy as np
+import seaborn as sns
+
+logger = logging.getLogger(__name__)
+
+# Rendering resolution and encoder settings for dashboard plots; fast zlib beats a few percent of PNG size
+PLOT_DPI = 120
+PLOT_PNG_KWARGS = {'optimize': False, 'compress_level': 1}
+
+# One worker per dashboard plot
+MAX_PLOT_WORKERS = 6
+
+# Plot style is global matplotlib state, so apply it once at import (in the server and in every worker)
+matplotlib.style.use('seaborn-v0_8-whitegrid')
+sns.set_palette("Set2")
+
+# Set default font sizes for better readability
+matplotlib.rcParams.update({
+    'font.size': 12,
+    'axes.titlesize': 16,
+    'axes.labelsize': 14,
+    'xtick.labelsize': 12,
+    'ytick.labelsize': 12,
+    'legend.fontsize': 12,
+    'figure.titlesize': 18
+})
+
+# Bar colors indexed by _classify_thresholds codes
+_THRESHOLD_COLORS = np.array(['green', 'orange', 'red'])
+
+_plot_executor: Optional[ProcessPoolExecutor] = None
+_plot_executor_lock = threading.Lock()
+
+
+def get_plot_executor() -> ProcessPoolExecutor:
+    """Return the shared plot rendering pool, creating it on first use"""
+    global _plot_executor
+    with _plot_executor_lock:
+        if _plot_executor is None:
+            # Spawn avoids forking the server's threads into the workers
+            _plot_executor = ProcessPoolExecutor(
+                max_workers=min(MAX_PLOT_WORKERS, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _plot_executor
+
+
+def warm_plot_executor():
+    """Start the rendering workers up front so the first analysis doesn't pay for matplotlib imports"""
+    executor = get_plot_executor()
+    for future in [executor.submit(_warm_worker) for _ in range(executor._max_workers)]:
+        future.result()
+    logger.info("Plot rendering workers started")
+
+
+def shutdown_plot_executor():
+    """Stop the rendering workers"""
+    global _plot_executor
+    with _plot_executor_lock:
+        if _plot_executor is not None:
+            _plot_executor.shutdown()
+            _plot_executor = None
+
+
+def _warm_worker():
+    _worker_axes()
+
+
+@functools.cache
+def _worker_axes() -> Tuple[Figure, Axes]:
+    """One figure per worker process, reused for every plot it renders and cleared in between"""
+    fig = Figure(figsize=(14, 8), layout='constrained')
+    return fig, fig.subplots()
+
+
+def figure_to_base64(fig: Figure) -> str:
+    """Encode a figure as base64 png"""
+    buf = BytesIO()
+    # Layout is handled by constrained_layout, so skip the extra bbox_inches='tight' render pass
+    fig.savefig(buf, format='png', dpi=PLOT_DPI, pil_kwargs=PLOT_PNG_KWARGS)
+    # Encode straight from the buffer's memory instead of copying it out first
+    return base64.b64encode(buf.getbuffer()).decode('ascii')
+
+
+@dataclass(frozen=True, slots=True)
+class PlotSpec:
+    """Everything that distinguishes one dashboard plot from another"""
+    key: str
+    metric: str
+    kind: str  # 'line', 'bar' or 'grouped_bar'
+    title: str
+    ylabel: str  # may reference {currency}
+    value_format: str = '{:,.0f}'
+    color: Optional[str] = None
+    fill: bool = False
+    # (good, moderate, higher_is_better) for bars colored by _classify_thresholds
+    thresholds: Optional[Tuple[float, float, bool]] = None
+    # bar only: put value labels below negative bars instead of always above
+    labels_follow_sign: bool = False
+    # (y, color, linestyle, alpha, legend label)
+    reference_lines: Tuple[Tuple[float, str, str, float, Optional[str]], ...] = ()
+    # grouped_bar only: the second series and the legend labels of both
+    second_metric: Optional[str] = None
+    series_labels: Tuple[str, ...] = ()
+    size: Tuple[int, int] = (14, 8)
+
+
+PLOT_SPECS = (
+    PlotSpec(
+        key='sales_trend',
+        metric='sales',
+        kind='line',
+        title='Sales/Revenue Trend',
+        ylabel='Sales ({currency})'
+    ),
+    PlotSpec(
+        key='growth_rate',
+        metric='growth_rate',
+        kind='bar',
+        title='Year-over-Year Growth Rate',
+        ylabel='Growth Rate (%)',
+        value_format='{:.1f}%',
+        thresholds=(0, 0, True),
+        labels_follow_sign=True,
+        reference_lines=((0, 'black', '-', 0.3, None),)
+    ),
+    PlotSpec(
+        key='assets_vs_liabilities',
+        metric='total_assets',
+        kind='grouped_bar',
+        title='Assets vs Liabilities',
+        ylabel='Amount ({currency})',
+        second_metric='total_liabilities',
+        series_labels=('Total Assets', 'Total Liabilities'),
+        size=(16, 8)
+    ),
+    PlotSpec(
+        key='net_worth',
+        metric='net_worth',
+        kind='line',
+        title='Net Worth/Equity Trend',
+        ylabel='Net Worth ({currency})',
+        color='green',
+        fill=True
+    ),
+    PlotSpec(
+        key='profit_margin',
+        metric='profit_margin',
+        kind='bar',
+        title='Profit Margin Trend',
+        ylabel='Profit Margin (%)',
+        value_format='{:.1f}%',
+        thresholds=(10, 5, True),
+        reference_lines=(
+            (10, 'green', '--', 0.5, 'Good (>10%)'),
+            (5, 'orange', '--', 0.5, 'Average (>5%)'),
+        )
+    ),
+    PlotSpec(
+        key='debt_to_equity',
+        metric='debt_to_equity',
+        kind='bar',
+        title='Debt-to-Equity Ratio',
+        ylabel='Debt-to-Equity Ratio',
+        value_format='{:.2f}',
+        thresholds=(1, 2, False),
+        reference_lines=(
+            (1, 'green', '--', 0.5, 'Good (<1)'),
+            (2, 'orange', '--', 0.5, 'Moderate (<2)'),
+        )
+    ),
+)
+
+
+def render_plot(spec_index: int, years: Sequence[str], *series: np.ndarray, currency: str) -> str:
+    """
+    Render PLOT_SPECS[spec_index] onto this worker's figure
+    Returns: base64-encoded image
+    """
+    spec = PLOT_SPECS[spec_index]
+    fig, ax = _worker_axes()
+    fig.set_size_inches(*spec.size)
+    try:
+        if spec.kind == 'line':
+            _draw_line(ax, spec, years, *series)
+        elif spec.kind == 'bar':
+            _draw_bar(ax, spec, years, *series)
+        else:
+            _draw_grouped_bar(ax, spec, years, *series)
+        
+        ax.set_title(spec.title, fontsize=16, fontweight='bold')
+        ax.set_xlabel('Year', fontsize=12)
+        ax.set_ylabel(spec.ylabel.format(currency=currency), fontsize=12)
+        for y, color, linestyle, alpha, label in spec.reference_lines:
+            ax.axhline(y=y, color=color, linestyle=linestyle, alpha=alpha, label=label)
+        ax.grid(True, alpha=0.3)
+        if spec.series_labels or any(line[4] for line in spec.reference_lines):
+            ax.legend()
+        
+        return figure_to_base64(fig)
+    finally:
+        ax.clear()
+
+
+def _classify_thresholds(
+    values: np.ndarray,
+    good: float,
+    moderate: float,
+    higher_is_better: bool = True
+) -> np.ndarray:
+    """Classify each value as 0 (good), 1 (moderate) or 2 (poor) against two thresholds"""
+    if higher_is_better:
+        return np.select([values > good, values > moderate], [0, 1], 2)
+    return np.select([values < good, values < moderate], [0, 1], 2)
+
+
+def _draw_line(ax: Axes, spec: PlotSpec, years, values):
+    if spec.fill:
+        ax.fill_between(years, values, alpha=0.3, color=spec.color)
+    ax.plot(years, values, marker='o', linewidth=2, markersize=8, color=spec.color)
+    
+    # Add value labels on points
+    for year, value in zip(years, values):
+        ax.annotate(spec.value_format.format(value), (year, value),
+                   textcoords="offset points", xytext=(0,10),
+                   ha='center', fontsize=10)
+
+
+def _draw_bar(ax: Axes, spec: PlotSpec, years, values):
+    colors = _THRESHOLD_COLORS[_classify_thresholds(values, *spec.thresholds)]
+    bars = ax.bar(years, values, color=colors, alpha=0.7)
+    
+    # Add value labels on bars
+    for bar, value in zip(bars, values):
+        height = bar.get_height()
+        va = 'top' if spec.labels_follow_sign and height <= 0 else 'bottom'
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+               spec.value_format.format(value), ha='center', va=va)
+
+
+def _draw_grouped_bar(ax: Axes, spec: PlotSpec, years, first_values, second_values):
+    x = range(len(years))
+    width = 0.35
+    
+    ax.bar([i - width/2 for i in x], first_values, width, label=spec.series_labels[0], alpha=0.8)
+    ax.bar([i + width/2 for i in x], second_values, width, label=spec.series_labels[1], alpha=0.8)
+    
+    ax.set_xticks(x)
+    ax.set_xticklabels(years)
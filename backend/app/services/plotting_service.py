@@ -1,50 +1,152 @@
 import asyncio
-import json
 import logging
-from typing import Dict, List, Optional, Any
+import math
+import re
+import orjson
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
 from datetime import datetime
 import os
 
-from app.services.ai_analysis import AIAnalysisService
-from app.core.config import settings
+from app.services.ai_analysis import AIAnalysisService, generate_gemini_content, genai_client
+from app.services.pdf_processor import PAGE_RE
+from app.services.plot_rendering import PLOT_SPECS, get_plot_executor, render_plot
 from app.models.user import User
 from app.models.company import Company
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Per-year metrics returned by the extraction prompt
+SERIES_METRICS = (
+    "sales",
+    "growth_rate",
+    "total_assets",
+    "total_liabilities",
+    "net_worth",
+    "profit_margin",
+    "debt_to_equity",
+)
+
+# Extraction prompts are split into windows of whole pages of roughly this size
+EXTRACTION_WINDOW_CHARS = 10_000
+
+# Leading ``` / ```json and trailing ``` fences in a model response
+_JSON_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+# Thousands separators, currency symbols/codes and percent signs the model sometimes leaves in values
+_NUMBER_NOISE = re.compile(r'[,%\s$€£¥₹]|\b[A-Z]{3}\b')
+
+def _parse_metric_value(value: Any) -> Optional[float]:
+    """Parse an extracted value such as 1200, "1,200", "$1.2" or "(300)"; None if it isn't a number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        text = _NUMBER_NOISE.sub('', value)
+        try:
+            number = float(text.strip('()'))
+        except ValueError:
+            return None
+        if text.startswith('(') and text.endswith(')'):
+            number = -number
+    else:
+        return None
+    # "NaN" / "inf" parse as floats but would break the plots and insights
+    return number if math.isfinite(number) else None
+
+@dataclass(slots=True)
+class MetricsBundle:
+    """Extracted series as arrays plus the derived figures insights need, computed once per analysis"""
+    soa: Dict[str, Tuple[List[str], np.ndarray]]
+    latest: Dict[str, float]
+    sales_growth: Optional[float]
+
 class PlottingService:
     def __init__(self):
-        self.gemini_client = None
-        self._initialize_gemini()
-    
-    def _initialize_gemini(self):
-        """Initialize Gemini client"""
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.gemini_client = genai.GenerativeModel('gemini-1.5-pro')
-            logger.info("Gemini client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini client: {e}")
-            self.gemini_client = None
+        # Reuse the client configured once in ai_analysis instead of building another model
+        self.gemini_client = genai_client
 
-    async def extract_financial_data_from_pdf(self, pdf_content: str, user: User, db: Session) -> Dict[str, Any]:
+    async def extract_financial_data_from_pdf(
+        self, 
+        pdf_content: str, 
+        user: User, 
+        db: Session, 
+        ai_service: AIAnalysisService
+    ) -> Dict[str, Any]:
         """Extract financial data from PDF content using Gemini"""
         if not self.gemini_client:
             raise Exception("Gemini client not initialized")
 
         # Get user's accessible verticals
-        ai_service = AIAnalysisService()
         user_verticals = ai_service._get_user_verticals(user)
         vertical_names = user_verticals
         
-        prompt = f"""
+        # Extract each page window concurrently, then merge the per-window results
+        windows = self._split_into_windows(pdf_content)
+        results = await asyncio.gather(
+            *(self._extract_window(self._create_extraction_prompt(window, vertical_names)) for window in windows),
+            return_exceptions=True
+        )
+        
+        window_data = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error extracting financial data: {result}")
+            else:
+                window_data.append(result)
+        
+        if not window_data:
+            return {
+                "sales": {},
+                "growth_rate": {},
+                "total_assets": {},
+                "total_liabilities": {},
+                "net_worth": {},
+                "profit_margin": {},
+                "debt_to_equity": {},
+                "extracted_companies": [],
+                "accessible_companies": vertical_names,
+                "currency": "USD",
+                "data_quality": "error"
+            }
+        
+        data = self._merge_window_data(window_data, vertical_names)
+        logger.info(
+            f"Successfully extracted financial data for user {user.username} "
+            f"from {len(window_data)}/{len(windows)} windows"
+        )
+        return data
+
+    def _split_into_windows(self, pdf_content: str) -> List[str]:
+        """Group whole pages into windows of about EXTRACTION_WINDOW_CHARS characters"""
+        pages = [
+            f"--- PAGE {match.group(1)} ---\n{match.group(2)}"
+            for match in PAGE_RE.finditer(pdf_content)
+        ] or [pdf_content]
+        
+        windows = []
+        current = []
+        current_chars = 0
+        for page in pages:
+            # An oversized page still goes out whole, as its own window
+            if current and current_chars + len(page) > EXTRACTION_WINDOW_CHARS:
+                windows.append("\n".join(current))
+                current = []
+                current_chars = 0
+            current.append(page)
+            current_chars += len(page)
+        
+        if current:
+            windows.append("\n".join(current))
+        return windows
+
+    def _create_extraction_prompt(self, window: str, vertical_names: List[str]) -> str:
+        """Create the extraction prompt for one window of PDF content"""
+        return f"""
         You are a financial data extraction expert. Extract the following financial metrics from the provided balance sheet data:
         
         REQUIRED METRICS TO EXTRACT:
@@ -69,7 +171,7 @@ class PlottingService:
         - Ensure all monetary values are in the same currency (preferably USD)
         
         PDF CONTENT:
-        {pdf_content}
+        {window}
         
         Return ONLY a valid JSON object with this structure:
         {{
@@ -112,204 +214,111 @@ class PlottingService:
         }}
         """
 
-        try:
-            response = self.gemini_client.generate_content(prompt)
-            result = response.text.strip()
-            
-            # Clean the response to extract JSON
-            if result.startswith("```json"):
-                result = result[7:]
-            if result.endswith("```"):
-                result = result[:-3]
-            
-            data = json.loads(result)
-            logger.info(f"Successfully extracted financial data for user {user.username}")
-            return data
+    async def _extract_window(self, prompt: str) -> Dict[str, Any]:
+        """Run one extraction prompt and parse its JSON result"""
+        response_text = await generate_gemini_content(prompt)
+        
+        # Strip markdown code fences around the JSON
+        return orjson.loads(_JSON_FENCE.sub('', response_text.strip()))
+
+    def _merge_window_data(self, window_data: List[Dict[str, Any]], vertical_names: List[str]) -> Dict[str, Any]:
+        """Union per-window results by year; for the same year, later windows' non-null values win"""
+        merged = {metric: {} for metric in SERIES_METRICS}
+        extracted_companies = []
+        
+        for data in window_data:
+            for metric in SERIES_METRICS:
+                for year, entry in (data.get(metric) or {}).items():
+                    if isinstance(entry, dict) and entry.get('value') is not None:
+                        merged[metric][year] = entry
+                    else:
+                        merged[metric].setdefault(year, entry)
             
-        except Exception as e:
-            logger.error(f"Error extracting financial data: {e}")
-            return {
-                "sales": {},
-                "growth_rate": {},
-                "total_assets": {},
-                "total_liabilities": {},
-                "net_worth": {},
-                "profit_margin": {},
-                "debt_to_equity": {},
-                "extracted_companies": [],
-                "accessible_companies": vertical_names,
-                "currency": "USD",
-                "data_quality": "error"
+            for company in data.get("extracted_companies") or []:
+                if company not in extracted_companies:
+                    extracted_companies.append(company)
+        
+        merged["extracted_companies"] = extracted_companies
+        merged["accessible_companies"] = vertical_names
+        merged["currency"] = next(
+            (data["currency"] for data in window_data if data.get("currency")), "USD"
+        )
+        merged["data_quality"] = next(
+            (data["data_quality"] for data in window_data if data.get("data_quality")), "low"
+        )
+        return merged
+
+    def _to_soa(self, financial_data: Dict[str, Any]) -> Dict[str, Tuple[List[str], np.ndarray]]:
+        """
+        Convert the per-year metric dicts into chronologically sorted years and float64 arrays
+        Returns: Dict[metric, (years, values)] with null and non-numeric entries dropped
+        """
+        soa = {}
+        for metric in SERIES_METRICS:
+            series = financial_data.get(metric) or {}
+            parsed = {
+                year: _parse_metric_value(entry.get('value'))
+                for year, entry in series.items()
+                if isinstance(entry, dict)
             }
+            years = sorted(year for year, value in parsed.items() if value is not None)
+            values = np.fromiter(
+                (parsed[year] for year in years),
+                dtype=np.float64,
+                count=len(years)
+            )
+            soa[metric] = (years, values)
+        return soa
 
-    def create_financial_plots(self, financial_data: Dict[str, Any]) -> Dict[str, str]:
+    def compute_metrics_bundle(self, financial_data: Dict[str, Any]) -> MetricsBundle:
+        """Build the arrays and derived figures shared by plots and insights"""
+        soa = self._to_soa(financial_data)
+        latest = {metric: float(values[-1]) for metric, (_, values) in soa.items() if values.size}
+        
+        sales_values = soa['sales'][1]
+        sales_growth = None
+        if sales_values.size >= 2 and sales_values[-2] != 0:
+            sales_growth = float((sales_values[-1] - sales_values[-2]) / sales_values[-2] * 100)
+        
+        return MetricsBundle(soa=soa, latest=latest, sales_growth=sales_growth)
+
+    async def create_financial_plots(
+        self, 
+        financial_data: Dict[str, Any],
+        metrics: Optional[MetricsBundle] = None
+    ) -> Dict[str, str]:
         """Create financial plots from extracted data"""
         plots = {}
         
         try:
-            # Set style for better visibility
-            plt.style.use('seaborn-v0_8-whitegrid')
-            sns.set_palette("Set2")
+            if metrics is None:
+                metrics = self.compute_metrics_bundle(financial_data)
+            soa = metrics.soa
             
-            # Set default font sizes for better readability
-            plt.rcParams.update({
-                'font.size': 12,
-                'axes.titlesize': 16,
-                'axes.labelsize': 14,
-                'xtick.labelsize': 12,
-                'ytick.labelsize': 12,
-                'legend.fontsize': 12,
-                'figure.titlesize': 18
-            })
+            currency = financial_data.get('currency', 'USD')
             
-            # 1. Sales Trend
-            if financial_data.get('sales'):
-                fig, ax = plt.subplots(figsize=(14, 8))
-                years = list(financial_data['sales'].keys())
-                sales_values = [financial_data['sales'][year]['value'] for year in years]
-                
-                ax.plot(years, sales_values, marker='o', linewidth=2, markersize=8)
-                ax.set_title('Sales/Revenue Trend', fontsize=16, fontweight='bold')
-                ax.set_xlabel('Year', fontsize=12)
-                ax.set_ylabel(f"Sales ({financial_data.get('currency', 'USD')})", fontsize=12)
-                ax.grid(True, alpha=0.3)
-                
-                # Add value labels on points
-                for i, (year, value) in enumerate(zip(years, sales_values)):
-                    ax.annotate(f'{value:,.0f}', (year, value), 
-                               textcoords="offset points", xytext=(0,10), 
-                               ha='center', fontsize=10)
-                
-                plt.tight_layout()
-                plots['sales_trend'] = self._fig_to_base64(fig)
-                plt.close()
-
-            # 2. Growth Rate
-            if financial_data.get('growth_rate'):
-                fig, ax = plt.subplots(figsize=(14, 8))
-                years = list(financial_data['growth_rate'].keys())
-                growth_values = [financial_data['growth_rate'][year]['value'] for year in years]
-                
-                colors = ['green' if x > 0 else 'red' for x in growth_values]
-                bars = ax.bar(years, growth_values, color=colors, alpha=0.7)
-                ax.set_title('Year-over-Year Growth Rate', fontsize=16, fontweight='bold')
-                ax.set_xlabel('Year', fontsize=12)
-                ax.set_ylabel('Growth Rate (%)', fontsize=12)
-                ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-                ax.grid(True, alpha=0.3)
-                
-                # Add value labels on bars
-                for bar, value in zip(bars, growth_values):
-                    height = bar.get_height()
-                    ax.text(bar.get_x() + bar.get_width()/2., height,
-                           f'{value:.1f}%', ha='center', va='bottom' if height > 0 else 'top')
-                
-                plt.tight_layout()
-                plots['growth_rate'] = self._fig_to_base64(fig)
-                plt.close()
-
-            # 3. Assets vs Liabilities
-            if financial_data.get('total_assets') and financial_data.get('total_liabilities'):
-                fig, ax = plt.subplots(figsize=(16, 8))
-                years = list(set(financial_data['total_assets'].keys()) & 
-                           set(financial_data['total_liabilities'].keys()))
-                years.sort()
-                
-                assets_values = [financial_data['total_assets'][year]['value'] for year in years]
-                liabilities_values = [financial_data['total_liabilities'][year]['value'] for year in years]
-                
-                x = range(len(years))
-                width = 0.35
-                
-                ax.bar([i - width/2 for i in x], assets_values, width, label='Total Assets', alpha=0.8)
-                ax.bar([i + width/2 for i in x], liabilities_values, width, label='Total Liabilities', alpha=0.8)
-                
-                ax.set_title('Assets vs Liabilities', fontsize=16, fontweight='bold')
-                ax.set_xlabel('Year', fontsize=12)
-                ax.set_ylabel(f"Amount ({financial_data.get('currency', 'USD')})", fontsize=12)
-                ax.set_xticks(x)
-                ax.set_xticklabels(years)
-                ax.legend()
-                ax.grid(True, alpha=0.3)
-                
-                plt.tight_layout()
-                plots['assets_vs_liabilities'] = self._fig_to_base64(fig)
-                plt.close()
-
-            # 4. Net Worth Trend
-            if financial_data.get('net_worth'):
-                fig, ax = plt.subplots(figsize=(14, 8))
-                years = list(financial_data['net_worth'].keys())
-                net_worth_values = [financial_data['net_worth'][year]['value'] for year in years]
-                
-                ax.fill_between(years, net_worth_values, alpha=0.3, color='green')
-                ax.plot(years, net_worth_values, marker='o', linewidth=2, markersize=8, color='green')
-                ax.set_title('Net Worth/Equity Trend', fontsize=16, fontweight='bold')
-                ax.set_xlabel('Year', fontsize=12)
-                ax.set_ylabel(f"Net Worth ({financial_data.get('currency', 'USD')})", fontsize=12)
-                ax.grid(True, alpha=0.3)
-                
-                # Add value labels
-                for i, (year, value) in enumerate(zip(years, net_worth_values)):
-                    ax.annotate(f'{value:,.0f}', (year, value), 
-                               textcoords="offset points", xytext=(0,10), 
-                               ha='center', fontsize=10)
-                
-                plt.tight_layout()
-                plots['net_worth'] = self._fig_to_base64(fig)
-                plt.close()
-
-            # 5. Profit Margin
-            if financial_data.get('profit_margin'):
-                fig, ax = plt.subplots(figsize=(14, 8))
-                years = list(financial_data['profit_margin'].keys())
-                margin_values = [financial_data['profit_margin'][year]['value'] for year in years]
+            # Each plot is independent CPU work, so render them in parallel worker processes
+            jobs = {}
+            for index, spec in enumerate(PLOT_SPECS):
+                years, values = soa[spec.metric]
+                if spec.second_metric is None:
+                    if years:
+                        jobs[spec.key] = (index, years, values)
+                    continue
                 
-                colors = ['green' if x > 10 else 'orange' if x > 5 else 'red' for x in margin_values]
-                bars = ax.bar(years, margin_values, color=colors, alpha=0.7)
-                ax.set_title('Profit Margin Trend', fontsize=16, fontweight='bold')
-                ax.set_xlabel('Year', fontsize=12)
-                ax.set_ylabel('Profit Margin (%)', fontsize=12)
-                ax.axhline(y=10, color='green', linestyle='--', alpha=0.5, label='Good (>10%)')
-                ax.axhline(y=5, color='orange', linestyle='--', alpha=0.5, label='Average (>5%)')
-                ax.grid(True, alpha=0.3)
-                ax.legend()
-                
-                # Add value labels
-                for bar, value in zip(bars, margin_values):
-                    height = bar.get_height()
-                    ax.text(bar.get_x() + bar.get_width()/2., height,
-                           f'{value:.1f}%', ha='center', va='bottom')
-                
-                plt.tight_layout()
-                plots['profit_margin'] = self._fig_to_base64(fig)
-                plt.close()
-
-            # 6. Debt-to-Equity Ratio
-            if financial_data.get('debt_to_equity'):
-                fig, ax = plt.subplots(figsize=(14, 8))
-                years = list(financial_data['debt_to_equity'].keys())
-                ratio_values = [financial_data['debt_to_equity'][year]['value'] for year in years]
-                
-                colors = ['green' if x < 1 else 'orange' if x < 2 else 'red' for x in ratio_values]
-                bars = ax.bar(years, ratio_values, color=colors, alpha=0.7)
-                ax.set_title('Debt-to-Equity Ratio', fontsize=16, fontweight='bold')
-                ax.set_xlabel('Year', fontsize=12)
-                ax.set_ylabel('Debt-to-Equity Ratio', fontsize=12)
-                ax.axhline(y=1, color='green', linestyle='--', alpha=0.5, label='Good (<1)')
-                ax.axhline(y=2, color='orange', linestyle='--', alpha=0.5, label='Moderate (<2)')
-                ax.grid(True, alpha=0.3)
-                ax.legend()
-                
-                # Add value labels
-                for bar, value in zip(bars, ratio_values):
-                    height = bar.get_height()
-                    ax.text(bar.get_x() + bar.get_width()/2., height,
-                           f'{value:.2f}', ha='center', va='bottom')
-                
-                plt.tight_layout()
-                plots['debt_to_equity'] = self._fig_to_base64(fig)
-                plt.close()
+                second_years, second_values = soa[spec.second_metric]
+                if years and second_years:
+                    # Plot only the years both series report
+                    years, idx, second_idx = np.intersect1d(years, second_years, return_indices=True)
+                    jobs[spec.key] = (index, years.tolist(), values[idx], second_values[second_idx])
+            
+            # Await the renders instead of blocking the event loop on them
+            executor = get_plot_executor()
+            images = await asyncio.gather(*(
+                asyncio.wrap_future(executor.submit(render_plot, *job, currency=currency))
+                for job in jobs.values()
+            ))
+            plots.update(zip(jobs, images))
 
         except Exception as e:
             logger.error(f"Error creating plots: {e}")
@@ -317,26 +326,26 @@ class PlottingService:
 
         return plots
 
-    def _fig_to_base64(self, fig) -> str:
-        """Convert matplotlib figure to base64 string"""
-        buf = BytesIO()
-        fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        buf.seek(0)
-        img_str = base64.b64encode(buf.getvalue()).decode()
-        buf.close()
-        return img_str
-
-    async def generate_financial_analysis(self, pdf_content: str, user: User, db: Session) -> Dict[str, Any]:
+    async def generate_financial_analysis(
+        self, 
+        pdf_content: str, 
+        user: User, 
+        db: Session, 
+        ai_service: AIAnalysisService
+    ) -> Dict[str, Any]:
         """Generate complete financial analysis with plots"""
         try:
             # Extract financial data
-            financial_data = await self.extract_financial_data_from_pdf(pdf_content, user, db)
+            financial_data = await self.extract_financial_data_from_pdf(pdf_content, user, db, ai_service)
+            
+            # Compute metrics once and share them between plots and insights
+            metrics = self.compute_metrics_bundle(financial_data)
             
             # Create plots
-            plots = self.create_financial_plots(financial_data)
+            plots = await self.create_financial_plots(financial_data, metrics)
             
             # Generate insights
-            insights = self._generate_insights(financial_data)
+            insights = self._generate_insights(financial_data, metrics)
             
             return {
                 "financial_data": financial_data,
@@ -355,69 +364,65 @@ class PlottingService:
                 "error": str(e)
             }
 
-    def _generate_insights(self, financial_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    def _generate_insights(
+        self, 
+        financial_data: Dict[str, Any],
+        metrics: Optional[MetricsBundle] = None
+    ) -> List[Dict[str, str]]:
         """Generate insights from financial data"""
         insights = []
         
         try:
+            if metrics is None:
+                metrics = self.compute_metrics_bundle(financial_data)
+            
             # Sales insights
-            if financial_data.get('sales'):
-                sales_years = list(financial_data['sales'].keys())
-                if len(sales_years) >= 2:
-                    latest_sales = financial_data['sales'][sales_years[-1]]['value']
-                    previous_sales = financial_data['sales'][sales_years[-2]]['value']
-                    growth = ((latest_sales - previous_sales) / previous_sales) * 100
-                    
-                    if growth > 10:
-                        insights.append({
-                            "type": "positive",
-                            "title": "Strong Sales Growth",
-                            "description": f"Sales grew by {growth:.1f}% year-over-year, indicating strong business performance."
-                        })
-                    elif growth < 0:
-                        insights.append({
-                            "type": "warning",
-                            "title": "Declining Sales",
-                            "description": f"Sales declined by {abs(growth):.1f}% year-over-year, requiring attention."
-                        })
+            growth = metrics.sales_growth
+            if growth is not None:
+                if growth > 10:
+                    insights.append({
+                        "type": "positive",
+                        "title": "Strong Sales Growth",
+                        "description": f"Sales grew by {growth:.1f}% year-over-year, indicating strong business performance."
+                    })
+                elif growth < 0:
+                    insights.append({
+                        "type": "warning",
+                        "title": "Declining Sales",
+                        "description": f"Sales declined by {abs(growth):.1f}% year-over-year, requiring attention."
+                    })
 
             # Profit margin insights
-            if financial_data.get('profit_margin'):
-                margin_years = list(financial_data['profit_margin'].keys())
-                if margin_years:
-                    latest_margin = financial_data['profit_margin'][margin_years[-1]]['value']
-                    
-                    if latest_margin > 15:
-                        insights.append({
-                            "type": "positive",
-                            "title": "Excellent Profitability",
-                            "description": f"Profit margin of {latest_margin:.1f}% indicates excellent operational efficiency."
-                        })
-                    elif latest_margin < 5:
-                        insights.append({
-                            "type": "warning",
-                            "title": "Low Profitability",
-                            "description": f"Profit margin of {latest_margin:.1f}% suggests need for cost optimization."
-                        })
+            latest_margin = metrics.latest.get('profit_margin')
+            if latest_margin is not None:
+                if latest_margin > 15:
+                    insights.append({
+                        "type": "positive",
+                        "title": "Excellent Profitability",
+                        "description": f"Profit margin of {latest_margin:.1f}% indicates excellent operational efficiency."
+                    })
+                elif latest_margin < 5:
+                    insights.append({
+                        "type": "warning",
+                        "title": "Low Profitability",
+                        "description": f"Profit margin of {latest_margin:.1f}% suggests need for cost optimization."
+                    })
 
             # Debt-to-equity insights
-            if financial_data.get('debt_to_equity'):
-                ratio_years = list(financial_data['debt_to_equity'].keys())
-                if ratio_years:
-                    latest_ratio = financial_data['debt_to_equity'][ratio_years[-1]]['value']
-                    
-                    if latest_ratio < 1:
-                        insights.append({
-                            "type": "positive",
-                            "title": "Healthy Debt Levels",
-                            "description": f"Debt-to-equity ratio of {latest_ratio:.2f} indicates conservative financial structure."
-                        })
-                    elif latest_ratio > 2:
-                        insights.append({
-                            "type": "warning",
-                            "title": "High Debt Levels",
-                            "description": f"Debt-to-equity ratio of {latest_ratio:.2f} suggests high financial leverage."
-                        })
+            latest_ratio = metrics.latest.get('debt_to_equity')
+            if latest_ratio is not None:
+                if latest_ratio < 1:
+                    insights.append({
+                        "type": "positive",
+                        "title": "Healthy Debt Levels",
+                        "description": f"Debt-to-equity ratio of {latest_ratio:.2f} indicates conservative financial structure."
+                    })
+                elif latest_ratio > 2:
+                    insights.append({
+                        "type": "warning",
+                        "title": "High Debt Levels",
+                        "description": f"Debt-to-equity ratio of {latest_ratio:.2f} suggests high financial leverage."
+                    })
 
         except Exception as e:
             logger.error(f"Error generating insights: {e}")
@@ -0,0 +1,7 @@
+-- Composite indexes for audit log queries
+CREATE INDEX IF NOT EXISTS ix_audit_user_created ON audit_logs(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_audit_failed_logins ON audit_logs(action, success, created_at DESC);
+
+-- Composite and partial indexes for data access log queries
+CREATE INDEX IF NOT EXISTS ix_dal_company_created ON data_access_logs(company_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_dal_high_volume_created ON data_access_logs(created_at DESC) WHERE record_count > 1000;
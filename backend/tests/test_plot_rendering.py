@@ -0,0 +1,123 @@
+import base64
+
+import numpy as np
+import pytest
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+from app.services.plot_rendering import (
+    PLOT_SPECS,
+    _classify_thresholds,
+    _draw_bar,
+    _draw_grouped_bar,
+    _draw_line,
+    _worker_axes,
+    render_plot,
+)
+
+YEARS = ['2021', '2022', '2023']
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def spec(key):
+    return next(spec for spec in PLOT_SPECS if spec.key == key)
+
+
+def new_axes():
+    return Figure().subplots()
+
+
+def bar_colors(ax):
+    return [patch.get_facecolor() for patch in ax.patches]
+
+
+def label_alignments(ax):
+    return [text.get_verticalalignment() for text in ax.texts]
+
+
+@pytest.mark.parametrize('spec_index', range(len(PLOT_SPECS)), ids=[spec.key for spec in PLOT_SPECS])
+def test_render_plot_returns_png_for_every_spec(spec_index):
+    series_count = 2 if PLOT_SPECS[spec_index].kind == 'grouped_bar' else 1
+    series = [np.array([1.0, -2.0, 3.0])] * series_count
+    
+    image = base64.b64decode(render_plot(spec_index, YEARS, *series, currency='INR'))
+    
+    assert image.startswith(PNG_SIGNATURE)
+
+
+def test_render_plot_clears_the_reused_axes():
+    render_plot(0, YEARS, np.array([1.0, 2.0, 3.0]), currency='INR')
+    
+    _, ax = _worker_axes()
+    assert not ax.lines and not ax.patches and not ax.texts
+    assert ax.get_title() == ''
+
+
+def test_line_labels_every_point():
+    ax = new_axes()
+    _draw_line(ax, spec('sales_trend'), YEARS, np.array([1000.0, 2499.6, -300.0]))
+    
+    assert [text.get_text() for text in ax.texts] == ['1,000', '2,500', '-300']
+    assert len(ax.lines) == 1
+    assert not ax.collections
+
+
+def test_filled_line_uses_spec_color():
+    ax = new_axes()
+    _draw_line(ax, spec('net_worth'), YEARS, np.array([1.0, 2.0, 3.0]))
+    
+    assert len(ax.collections) == 1
+    assert ax.lines[0].get_color() == 'green'
+
+
+def test_profit_margin_bars_colored_by_threshold_with_labels_above():
+    ax = new_axes()
+    _draw_bar(ax, spec('profit_margin'), YEARS, np.array([12.0, 7.0, -1.0]))
+    
+    assert bar_colors(ax) == [to_rgba(color, 0.7) for color in ('green', 'orange', 'red')]
+    assert [text.get_text() for text in ax.texts] == ['12.0%', '7.0%', '-1.0%']
+    assert label_alignments(ax) == ['bottom', 'bottom', 'bottom']
+
+
+def test_debt_to_equity_bars_lower_is_better():
+    ax = new_axes()
+    _draw_bar(ax, spec('debt_to_equity'), YEARS, np.array([0.5, 1.5, 2.5]))
+    
+    assert bar_colors(ax) == [to_rgba(color, 0.7) for color in ('green', 'orange', 'red')]
+    assert [text.get_text() for text in ax.texts] == ['0.50', '1.50', '2.50']
+    assert label_alignments(ax) == ['bottom', 'bottom', 'bottom']
+
+
+def test_growth_rate_labels_follow_sign():
+    ax = new_axes()
+    _draw_bar(ax, spec('growth_rate'), YEARS, np.array([5.0, -3.0, 0.0]))
+    
+    assert bar_colors(ax) == [to_rgba(color, 0.7) for color in ('green', 'red', 'red')]
+    assert label_alignments(ax) == ['bottom', 'top', 'top']
+
+
+def test_grouped_bar_pairs_series_by_year():
+    ax = new_axes()
+    _draw_grouped_bar(
+        ax, spec('assets_vs_liabilities'), YEARS,
+        np.array([10.0, 20.0, 30.0]), np.array([5.0, 15.0, 25.0])
+    )
+    
+    assert [container.get_label() for container in ax.containers] == ['Total Assets', 'Total Liabilities']
+    assert [[bar.get_height() for bar in container] for container in ax.containers] == [
+        [10.0, 20.0, 30.0],
+        [5.0, 15.0, 25.0],
+    ]
+    assert [label.get_text() for label in ax.get_xticklabels()] == YEARS
+    assert not ax.texts
+
+
+@pytest.mark.parametrize('higher_is_better, expected', [
+    (True, [0, 1, 2, 2]),
+    (False, [2, 2, 1, 0]),
+])
+def test_classify_thresholds(higher_is_better, expected):
+    good, moderate = (10, 5) if higher_is_better else (1, 2)
+    values = np.array([12.0, 7.0, 5.0, 0.5]) if higher_is_better else np.array([3.0, 2.0, 1.5, 0.5])
+    
+    assert _classify_thresholds(values, good, moderate, higher_is_better).tolist() == expected
@@ -10,7 +10,7 @@ from pathlib import Path
 # Add backend to path for imports
 sys.path.append(str(Path(__file__).parent.parent / "backend"))
 
-from app.services.pinecone_store import PineconeStore
+from app.services.pinecone_store import get_pinecone_store
 from app.services.pdf_processor import PDFProcessor
 from app.core.config import settings
 
@@ -21,7 +21,7 @@ def test_pinecone_integration():
     
     try:
         # Initialize Pinecone store
-        pinecone_store = PineconeStore()
+        pinecone_store = get_pinecone_store()
         print("✅ Pinecone store initialized successfully")
         
         # Test health check